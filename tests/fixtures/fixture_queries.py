@@ -0,0 +1,14 @@
+import pytest
+from django.core.cache import cache
+
+from tests.utils import assert_max_queries
+
+
+@pytest.fixture
+def query_budget():
+    """Контекстный менеджер: with query_budget(8): client.get(...).
+
+    Кэш очищается, чтобы измерялся самый дорогой, холодный запрос.
+    """
+    cache.clear()
+    return assert_max_queries
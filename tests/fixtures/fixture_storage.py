@@ -0,0 +1,9 @@
+import pytest
+
+from core.testing import isolated_storage
+
+
+@pytest.fixture(scope='session', autouse=True)
+def isolated_test_storage():
+    with isolated_storage():
+        yield
@@ -0,0 +1,103 @@
+import pytest
+from django.contrib.auth import get_user_model
+
+from posts.models import Comment, Follow, Group, Post
+from tests.utils import max_queries
+
+User = get_user_model()
+
+# Бюджеты для холодного кэша; число строк на странице на них не влияет.
+BUDGETS = {
+    'index': 1,
+    'group_posts': 3,
+    'profile': 3,
+    'post_detail': 5,
+    'follow_index': 4,
+    'add_comment': 7,
+    'post_comments': 2,
+}
+
+
+@pytest.fixture(params=[1, 10], ids=['1-row', '10-rows'])
+def rows(request):
+    return request.param
+
+
+@pytest.fixture
+def group():
+    return Group.objects.create(title='Группа', slug='budget-group')
+
+
+@pytest.fixture
+def authors(rows):
+    return [
+        User.objects.create_user(username=f'author{i}', first_name='Имя')
+        for i in range(rows)
+    ]
+
+
+@pytest.fixture
+def posts(authors, group):
+    return [
+        Post.objects.create(author=author, group=group, text=f'Пост {i}')
+        for i, author in enumerate(authors)
+    ]
+
+
+@pytest.fixture
+def commented_post(user, authors):
+    post = Post.objects.create(author=user, text='Пост с комментариями')
+    for author in authors:
+        Comment.objects.create(post=post, author=author, text='Комментарий')
+    return post
+
+
+@pytest.fixture
+def followed_posts(user, posts):
+    for post in posts:
+        Follow.objects.create(user=user, author=post.author)
+    return posts
+
+
+@pytest.mark.django_db(transaction=True)
+class TestQueryBudget:
+
+    def test_index(self, client, posts, query_budget):
+        with query_budget(BUDGETS['index']):
+            response = client.get('/')
+        assert len(response.context['page_obj']) == len(posts)
+
+    def test_group_posts(self, client, posts, group, query_budget):
+        with query_budget(BUDGETS['group_posts']):
+            response = client.get(f'/group/{group.slug}/')
+        assert len(response.context['page_obj']) == len(posts)
+
+    def test_profile(self, client, user, rows, query_budget):
+        for i in range(rows):
+            Post.objects.create(author=user, text=f'Пост {i}')
+        with query_budget(BUDGETS['profile']):
+            response = client.get(f'/profile/{user.username}/')
+        assert len(response.context['page_obj']) == rows
+
+    def test_post_detail(self, user_client, commented_post, query_budget):
+        with query_budget(BUDGETS['post_detail']):
+            response = user_client.get(f'/posts/{commented_post.pk}/')
+        assert response.status_code == 200
+
+    def test_follow_index(self, user_client, followed_posts, query_budget):
+        with query_budget(BUDGETS['follow_index']):
+            response = user_client.get('/follow/')
+        assert len(response.context['page_obj']) == len(followed_posts)
+
+    def test_post_comments(self, client, commented_post, query_budget):
+        with query_budget(BUDGETS['post_comments']):
+            response = client.get(f'/posts/{commented_post.pk}/comments/')
+        assert response.status_code == 200
+
+    @max_queries(BUDGETS['add_comment'])
+    def test_add_comment(self, user_client, commented_post):
+        response = user_client.post(
+            f'/posts/{commented_post.pk}/comment/',
+            data={'text': 'Новый комментарий'},
+        )
+        assert response.status_code == 302
@@ -1,5 +1,60 @@
+import functools
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
 def get_field_from_context(context, field_type):
     for field in context.keys():
         if field not in ('user', 'request') and isinstance(context[field], field_type):
             return context[field]
     return
+
+
+SQL_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+SQL_IN_LIST = re.compile(r'IN \((?:\?, )*\?\)')
+
+
+def normalize_sql(sql):
+    """Заменяет значения на ?, чтобы одинаковые запросы совпадали."""
+    sql = SQL_LITERAL.sub('?', sql)
+    sql = SQL_IN_LIST.sub('IN (...)', sql)
+    return ' '.join(sql.split())
+
+
+def format_queries(queries, budget):
+    grouped = Counter(normalize_sql(query['sql']) for query in queries)
+    lines = [
+        f'Выполнено запросов: {len(queries)}, бюджет: {budget}. '
+        f'Запросы, сгруппированные по шаблону:'
+    ]
+    for sql, count in grouped.most_common():
+        lines.append(f'{count:>5} × {sql}')
+    return '\n'.join(lines)
+
+
+@contextmanager
+def assert_max_queries(budget):
+    """Падает, если внутри блока выполнено больше budget запросов."""
+    with CaptureQueriesContext(connection) as context:
+        yield context
+    if len(context) > budget:
+        raise AssertionError(format_queries(context.captured_queries, budget))
+
+
+def max_queries(budget):
+    """Декоратор теста: всё тело теста укладывается в budget запросов.
+
+    Данные стоит готовить в фикстурах: они выполняются до теста и в
+    бюджет не входят.
+    """
+    def decorator(test):
+        @functools.wraps(test)
+        def wrapper(*args, **kwargs):
+            with assert_max_queries(budget):
+                return test(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,34 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'task',
+        'status',
+        'attempts',
+        'run_at',
+        'finished',
+    )
+    list_filter = ('status', 'task')
+    search_fields = ('task', 'key')
+    date_hierarchy = 'run_at'
+    empty_value_display = '-пусто-'
+    actions = ('retry',)
+
+    def retry(self, request, queryset):
+        """Возвращает упавшие задачи в очередь с новым запасом попыток."""
+        updated = queryset.filter(status=Job.FAILED).update(
+            status=Job.QUEUED,
+            attempts=0,
+            run_at=timezone.now(),
+            finished=None,
+        )
+        self.message_user(request, f'Возвращено в очередь: {updated}')
+    retry.short_description = 'Повторить упавшие задачи'
+
+
+admin.site.register(Job, JobAdmin)
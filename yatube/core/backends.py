@@ -0,0 +1,56 @@
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+from . import metrics
+
+_MISSING = object()
+
+
+class MeteredCacheMixin:
+    """Считает попадания и промахи кэша для текущего запроса."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            metrics.record_cache(0, 1)
+            return default
+        metrics.record_cache(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        # Базовый get_many может вызывать get по ключам: не считаем дважды.
+        with metrics.suspended():
+            found = super().get_many(keys, version)
+        metrics.record_cache(len(found), len(keys) - len(found))
+        return found
+
+
+class MeteredLocMemCache(MeteredCacheMixin, LocMemCache):
+    pass
+
+
+class MeteredFileBasedCache(MeteredCacheMixin, FileBasedCache):
+    pass
+
+
+class MeteredTemplate(Template):
+    def render(self, context=None, request=None):
+        with metrics.template_timer():
+            return super().render(context, request)
+
+
+class MeteredDjangoTemplates(DjangoTemplates):
+    """Шаблонный движок Django, который замеряет время отрисовки."""
+
+    def from_string(self, template_code):
+        return MeteredTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return MeteredTemplate(
+                self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+# Поля расписания: минуты, часы, день месяца, месяц, день недели
+# (0 и 7 — воскресенье).
+FIELDS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+# Расписание вроде 30 февраля не сработает никогда; дальше не ищем.
+SEARCH_LIMIT = timedelta(days=5 * 366)
+
+
+def parse_field(text, low, high):
+    """Значения одного поля: *, числа, диапазоны a-b и шаг /n через запятую."""
+    values = set()
+    for part in text.split(','):
+        spec, slash, step = part.partition('/')
+        step = int(step) if slash else 1
+        if spec == '*':
+            start, end = low, high
+        elif '-' in spec:
+            start, end = map(int, spec.split('-', 1))
+        else:
+            start = int(spec)
+            end = high if slash else start
+        if step < 1 or not low <= start <= end <= high:
+            raise ValueError(f'Неверное поле расписания: {part}')
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class Cron:
+    """Расписание в формате cron из пяти полей.
+
+    Как в cron, если ограничены и день месяца, и день недели, подходит
+    день, совпавший хотя бы с одним из них.
+    """
+
+    def __init__(self, expression):
+        parts = expression.split()
+        if len(parts) != len(FIELDS):
+            raise ValueError(f'Нужно пять полей расписания: {expression}')
+        (self.minutes, self.hours, self.days, self.months,
+         weekdays) = [
+            parse_field(part, low, high)
+            for part, (low, high) in zip(parts, FIELDS)
+        ]
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = parts[2] == '*'
+        self.any_weekday = parts[4] == '*'
+
+    def day_matches(self, moment):
+        day = moment.day in self.days
+        weekday = moment.isoweekday() % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, moment):
+        """Первая минута расписания строго позже moment.
+
+        moment — наивное местное время; несовпадающие месяц, день и час
+        пропускаются целиком.
+        """
+        moment = moment.replace(second=0, microsecond=0) + timedelta(
+            minutes=1)
+        limit = moment + SEARCH_LIMIT
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0)
+                          + timedelta(days=32)).replace(day=1)
+            elif not self.day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(
+                    days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError('Расписание никогда не срабатывает.')
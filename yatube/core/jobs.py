@@ -0,0 +1,239 @@
+import json
+import logging
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import (DatabaseError, IntegrityError, close_old_connections,
+                       connection, transaction)
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .cron import Cron
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+WORKER_KEY = 'jobs:worker'
+
+_tasks = {}
+_discovered = False
+
+
+def task(name, max_attempts=None):
+    """Регистрирует функцию как задачу очереди.
+
+    Имя хранится в строках Job, поэтому не должно меняться при
+    переносе функции. Задачи ищутся в модулях tasks приложений.
+    Выполнение гарантируется хотя бы один раз: задача, чей воркер
+    упал, выполнится повторно, поэтому она должна быть идемпотентной.
+    """
+    def decorator(func):
+        func.job_name = name
+        func.max_attempts = max_attempts or settings.JOBS_MAX_ATTEMPTS
+        _tasks[name] = func
+        return func
+    return decorator
+
+
+def get_task(name):
+    global _discovered
+    if name not in _tasks and not _discovered:
+        autodiscover_modules('tasks')
+        _discovered = True
+    return _tasks[name]
+
+
+def enqueue(task, *args, key=None, run_at=None):
+    """Ставит задачу в очередь и сразу возвращает строку Job.
+
+    Строка пишется в текущей транзакции: воркер увидит задачу только
+    после коммита, а при откате её не будет вовсе. Аргументы должны
+    сериализоваться в JSON. Если задача с таким key уже есть, новая не
+    создаётся и возвращается существующая.
+    """
+    func = get_task(task) if isinstance(task, str) else task
+    fields = {
+        'task': func.job_name,
+        'payload': json.dumps(args),
+        'run_at': run_at or timezone.now(),
+        'max_attempts': func.max_attempts,
+    }
+    if key is None:
+        return Job.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            return Job.objects.create(key=key, **fields)
+    except IntegrityError:
+        return Job.objects.get(key=key)
+
+
+def claimable(now):
+    # Задачи воркера, который не успел отчитаться до locked_until,
+    # считаются брошенными и выполняются заново.
+    return (Q(status=Job.QUEUED, run_at__lte=now)
+            | Q(status=Job.RUNNING, locked_until__lt=now))
+
+
+def claim(worker, limit):
+    """Захватывает до limit готовых задач и возвращает их id.
+
+    Захват — условный UPDATE по одной строке: из нескольких воркеров,
+    выбравших одну задачу, её получит только один. Попытка считается
+    уже при захвате, так что задача, роняющая воркер, не крутится
+    вечно.
+    """
+    if limit < 1:
+        return []
+    now = timezone.now()
+    candidates = Job.objects.filter(claimable(now)).order_by(
+        'run_at', 'pk').values_list('pk', flat=True)[:limit]
+    locked_until = now + timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    return [
+        pk for pk in list(candidates)
+        if Job.objects.filter(claimable(now), pk=pk).update(
+            status=Job.RUNNING,
+            locked_by=worker,
+            locked_until=locked_until,
+            attempts=F('attempts') + 1,
+        )
+    ]
+
+
+def renew(worker, pks):
+    """Продлевает блокировку задач, которые воркер ещё выполняет.
+
+    Без этого задача дольше JOBS_LOCK_TIMEOUT считалась бы брошенной и
+    запускалась бы вторым воркером, пока первый её не закончил.
+    """
+    if not pks:
+        return 0
+    locked_until = timezone.now() + timedelta(
+        seconds=settings.JOBS_LOCK_TIMEOUT)
+    return Job.objects.filter(
+        pk__in=pks, status=Job.RUNNING, locked_by=worker,
+    ).update(locked_until=locked_until)
+
+
+def worker_alive():
+    """Работает ли хоть один run_jobs: его Heartbeat держит метку в кэше."""
+    return cache.get(WORKER_KEY) is not None
+
+
+def backoff(attempts):
+    """Пауза перед повтором: JOBS_BACKOFF, удваиваясь с каждой попыткой."""
+    return min(settings.JOBS_BACKOFF * 2 ** (attempts - 1),
+               settings.JOBS_BACKOFF_MAX)
+
+
+def fail(job, error):
+    now = timezone.now()
+    if job.attempts < job.max_attempts:
+        fields = {
+            'status': Job.QUEUED,
+            'run_at': now + timedelta(seconds=backoff(job.attempts)),
+        }
+    else:
+        fields = {'status': Job.FAILED, 'finished': now}
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        last_error=error, locked_until=None, **fields)
+
+
+def execute(pk):
+    """Выполняет захваченную задачу и записывает результат.
+
+    Вызывается в потоке или процессе пула воркера, поэтому сама
+    открывает и закрывает соединения с базой.
+    """
+    close_old_connections()
+    try:
+        job = Job.objects.get(pk=pk)
+        try:
+            get_task(job.task)(*json.loads(job.payload))
+        except Exception:
+            logger.exception('Задача %s не выполнена', job)
+            fail(job, traceback.format_exc())
+        else:
+            Job.objects.filter(pk=pk, locked_by=job.locked_by).update(
+                status=Job.DONE,
+                finished=timezone.now(),
+                locked_until=None,
+            )
+    finally:
+        close_old_connections()
+
+
+class Scheduler:
+    """Ставит в очередь ближайший запуск каждой задачи из JOBS_PERIODIC.
+
+    Время запуска входит в ключ идемпотентности, поэтому каждый запуск
+    ставится один раз, сколько бы воркеров ни работало.
+    """
+
+    def __init__(self, periodic):
+        self.entries = {
+            name: (Cron(entry['cron']), entry['task'], entry.get('args', []))
+            for name, entry in periodic.items()
+        }
+        self.scheduled = {}
+
+    def tick(self, now=None):
+        local = timezone.localtime(now).replace(tzinfo=None)
+        for name, (cron, task_name, args) in self.entries.items():
+            slot = cron.next_after(local)
+            if self.scheduled.get(name) == slot:
+                continue
+            enqueue(
+                task_name, *args,
+                key=f'periodic:{name}:{slot:%Y-%m-%dT%H:%M}',
+                run_at=timezone.make_aware(slot, is_dst=False),
+            )
+            self.scheduled[name] = slot
+
+
+class Heartbeat(threading.Thread):
+    """Каждые JOBS_HEARTBEAT секунд продлевает блокировки задач воркера.
+
+    Работает в отдельном потоке, чтобы блокировки продлевались и тогда,
+    когда задача выполняется в основном потоке (--workers 0). Заодно
+    обновляет метку worker_alive; она истекает через три пропущенных
+    удара.
+    """
+
+    def __init__(self, worker):
+        super().__init__(name='jobs-heartbeat', daemon=True)
+        self.worker = worker
+        self.running = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def add(self, pk):
+        with self.lock:
+            self.running.add(pk)
+
+    def discard(self, pk):
+        with self.lock:
+            self.running.discard(pk)
+
+    def beat(self):
+        cache.set(WORKER_KEY, self.worker, settings.JOBS_HEARTBEAT * 3)
+        with self.lock:
+            pks = list(self.running)
+        try:
+            renew(self.worker, pks)
+        except DatabaseError:
+            logger.exception('Не удалось продлить блокировку задач %s', pks)
+
+    def run(self):
+        try:
+            while not self.stopped.wait(settings.JOBS_HEARTBEAT):
+                self.beat()
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
@@ -0,0 +1,122 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from sorl.thumbnail.kvstores.base import KVStoreBase
+
+# Ограничение SQLite на число параметров в одном запросе.
+MAX_VARIABLES = 500
+
+
+class KVStore(KVStoreBase):
+    """KV-store sorl-thumbnail: LRU в памяти процесса поверх файла SQLite.
+
+    Файл THUMBNAIL_KVSTORE_PATH лежит вне MEDIA_ROOT, чтобы его нельзя
+    было скачать, и метаданные не ходят ни в основную базу, ни в общий
+    кэш.
+    Записи LRU живут THUMBNAIL_KVSTORE_LRU_TIMEOUT секунд, так что
+    изменения из других процессов становятся видны с этой задержкой.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()
+
+    @property
+    def path(self):
+        return settings.THUMBNAIL_KVSTORE_PATH
+
+    def _connection(self):
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        path = self.path
+        connection = connections.get(path)
+        if connection is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            connection = sqlite3.connect(
+                path, timeout=10, isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS kvstore ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID'
+            )
+            connections[path] = connection
+        return connection
+
+    def _lru_get(self, key):
+        lru_key = (self.path, key)
+        with self._lock:
+            entry = self._lru.get(lru_key)
+            if entry is None:
+                return False, None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._lru[lru_key]
+                return False, None
+            self._lru.move_to_end(lru_key)
+            return True, value
+
+    def _lru_put(self, key, value):
+        expires = time.monotonic() + settings.THUMBNAIL_KVSTORE_LRU_TIMEOUT
+        with self._lock:
+            self._lru[(self.path, key)] = (value, expires)
+            self._lru.move_to_end((self.path, key))
+            while len(self._lru) > settings.THUMBNAIL_KVSTORE_LRU_SIZE:
+                self._lru.popitem(last=False)
+
+    def _lru_forget(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._lru.pop((self.path, key), None)
+
+    def prefetch_raw(self, keys):
+        """Загружает в LRU сразу все ключи, которых там ещё нет."""
+        missing = [key for key in keys if not self._lru_get(key)[0]]
+        for start in range(0, len(missing), MAX_VARIABLES):
+            chunk = missing[start:start + MAX_VARIABLES]
+            rows = dict(self._connection().execute(
+                'SELECT key, value FROM kvstore WHERE key IN ({})'.format(
+                    ', '.join('?' * len(chunk))),
+                chunk,
+            ))
+            for key in chunk:
+                # Отсутствие ключа тоже запоминаем, чтобы не спрашивать снова.
+                self._lru_put(key, rows.get(key))
+
+    def _get_raw(self, key):
+        found, value = self._lru_get(key)
+        if not found:
+            row = self._connection().execute(
+                'SELECT value FROM kvstore WHERE key = ?', (key,)
+            ).fetchone()
+            value = row[0] if row else None
+            self._lru_put(key, value)
+        return value
+
+    def _set_raw(self, key, value):
+        self._connection().execute(
+            'INSERT OR REPLACE INTO kvstore (key, value) VALUES (?, ?)',
+            (key, value),
+        )
+        self._lru_put(key, value)
+
+    def _delete_raw(self, *keys):
+        self._connection().executemany(
+            'DELETE FROM kvstore WHERE key = ?', [(key,) for key in keys])
+        self._lru_forget(*keys)
+
+    def _find_keys_raw(self, prefix):
+        rows = self._connection().execute(
+            'SELECT key FROM kvstore WHERE key >= ? AND key < ?',
+            (prefix, prefix + '\U0010ffff'),
+        )
+        return [key for key, in rows]
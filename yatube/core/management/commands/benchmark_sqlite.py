@@ -0,0 +1,153 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from core.sqlite import apply_pragmas
+
+# Поведение Django по умолчанию: журнал отката и полная синхронизация.
+DEFAULT_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+FEED_SQL = (
+    'SELECT p.id, p.text, p.created, u.username FROM posts_post p '
+    'JOIN auth_user u ON u.id = p.author_id '
+    'ORDER BY p.created DESC, p.id DESC LIMIT 10'
+)
+COMMENTS_SQL = (
+    'SELECT c.id, c.text, u.username FROM posts_comment c '
+    'JOIN auth_user u ON u.id = c.author_id WHERE c.post_id = ? '
+    'ORDER BY c.created DESC, c.id DESC LIMIT 10'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает чтение и запись при одновременной нагрузке на копии '
+        'базы: настройки SQLite по умолчанию и SQLITE_PRAGMAS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда работает только с SQLite.')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'benchmark.sqlite3')
+            self.copy_database(connection, path)
+            self.stdout.write(
+                f'{options["readers"]} читателей, {options["writers"]} '
+                f'писателей, {options["seconds"]} с на режим:')
+            for title, pragmas in (
+                ('по умолчанию', DEFAULT_PRAGMAS),
+                ('SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS),
+            ):
+                self.report(title, self.run(path, pragmas, options))
+
+    def copy_database(self, connection, path):
+        connection.ensure_connection()
+        target = sqlite3.connect(path)
+        connection.connection.backup(target)
+        post_ids = [row[0] for row in target.execute(
+            'SELECT id FROM posts_post ORDER BY id DESC LIMIT 1000')]
+        self.author_ids = [row[0] for row in target.execute(
+            'SELECT id FROM auth_user LIMIT 1000')]
+        target.close()
+        if not post_ids:
+            raise CommandError(
+                'В базе нет постов: сначала выполните generate_dataset.')
+        self.post_ids = post_ids
+
+    def connect(self, path, pragmas):
+        # timeout=5 — значение sqlite3 по умолчанию, с которым
+        # подключается Django, если OPTIONS не заданы.
+        connection = sqlite3.connect(
+            path, timeout=5, isolation_level=None, check_same_thread=False)
+        apply_pragmas(connection.cursor(), pragmas)
+        return connection
+
+    def read(self, connection):
+        connection.execute(FEED_SQL).fetchall()
+        connection.execute(
+            COMMENTS_SQL, [random.choice(self.post_ids)]).fetchall()
+
+    def write(self, connection):
+        # Как Django: отложенный BEGIN, запись комментария и счётчика.
+        post_id = random.choice(self.post_ids)
+        connection.execute('BEGIN')
+        try:
+            connection.execute(
+                'INSERT INTO posts_comment '
+                '(post_id, author_id, text, created) VALUES (?, ?, ?, ?)',
+                [post_id, random.choice(self.author_ids), 'Нагрузка',
+                 timezone.now().isoformat(' ')],
+            )
+            connection.execute(
+                'UPDATE posts_post SET comment_count = comment_count + 1 '
+                'WHERE id = ?', [post_id])
+            connection.execute('COMMIT')
+        except sqlite3.OperationalError:
+            connection.execute('ROLLBACK')
+            raise
+
+    def worker(self, path, pragmas, operation, deadline, results):
+        # journal_mode уже выставлен и хранится в файле; повторная смена
+        # режима под нагрузкой сама ловит database is locked.
+        connection = self.connect(path, {
+            name: value for name, value in pragmas.items()
+            if name != 'journal_mode'
+        })
+        latencies, errors = [], 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                operation(connection)
+            except sqlite3.OperationalError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+        connection.close()
+        results.append((latencies, errors))
+
+    def run(self, path, pragmas, options):
+        self.connect(path, pragmas).close()
+        deadline = time.monotonic() + options['seconds']
+        reads, writes = [], []
+        threads = [
+            threading.Thread(target=self.worker, args=(
+                path, pragmas, self.read, deadline, reads))
+            for _ in range(options['readers'])
+        ] + [
+            threading.Thread(target=self.worker, args=(
+                path, pragmas, self.write, deadline, writes))
+            for _ in range(options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return reads, writes, options['seconds']
+
+    def report(self, title, result):
+        reads, writes, seconds = result
+        self.stdout.write(f'  {title}:')
+        for name, results in (('чтение', reads), ('запись', writes)):
+            latencies = [value for values, _ in results for value in values]
+            errors = sum(errors for _, errors in results)
+            p99 = (statistics.quantiles(latencies, n=100)[98] * 1000
+                   if len(latencies) > 1 else 0)
+            self.stdout.write(
+                f'    {name:<7} {len(latencies) / seconds:10.0f} оп/с  '
+                f'p99 {p99:8.2f} мс  ошибок {errors}')
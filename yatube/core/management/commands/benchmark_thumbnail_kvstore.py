@@ -0,0 +1,99 @@
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from PIL import Image
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as CachedDBStore
+
+from core.kvstore import KVStore as LocalStore
+from posts.thumbnails import backend, generate_thumbnail
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск метаданных миниатюр для ленты из N постов: '
+        'стандартный cached_db KV-store и core.kvstore.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10)
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as media_root:
+            with override_settings(
+                MEDIA_ROOT=media_root,
+                THUMBNAIL_KVSTORE_PATH=os.path.join(
+                    media_root, 'kvstore.sqlite3'),
+            ):
+                with transaction.atomic():
+                    self.run(media_root, options['posts'],
+                             options['iterations'])
+                    transaction.set_rollback(True)
+
+    def prepare(self, media_root, posts):
+        """Создаёт картинки с миниатюрами и записывает их в оба хранилища."""
+        os.makedirs(os.path.join(media_root, 'posts'))
+        thumbnails = []
+        cached_db, local = CachedDBStore(), LocalStore()
+        for i in range(posts):
+            name = f'posts/benchmark_{i}.jpg'
+            Image.new('RGB', (1600, 1200), (i * 20 % 255, 90, 160)).save(
+                os.path.join(media_root, name))
+            generate_thumbnail(name)
+            source = ImageFile(name)
+            thumbnail = backend.get_thumbnail_file(
+                name, '960x339', crop='center', upscale=True)
+            for store in (cached_db, local):
+                store.set(source)
+                store.set(thumbnail, source)
+            thumbnails.append(thumbnail)
+        return cached_db, local, thumbnails
+
+    def measure(self, func, reset, iterations):
+        total = 0
+        for _ in range(iterations):
+            reset()
+            started = time.perf_counter()
+            func()
+            total += time.perf_counter() - started
+        return total / iterations
+
+    def run(self, media_root, posts, iterations):
+        cached_db, local, thumbnails = self.prepare(media_root, posts)
+        keys = [add_prefix(thumbnail.key) for thumbnail in thumbnails]
+
+        def render(store):
+            for thumbnail in thumbnails:
+                store.get(thumbnail)
+
+        def clear_cache():
+            for key in keys:
+                cached_db.cache.delete(key)
+
+        def keep():
+            pass
+
+        cases = [
+            ('cached_db, тёплый кэш', lambda: render(cached_db), keep),
+            ('cached_db, холодный кэш', lambda: render(cached_db),
+             clear_cache),
+            ('core.kvstore, тёплый LRU', lambda: render(local), keep),
+            ('core.kvstore, холодный LRU', lambda: render(local),
+             local._lru.clear),
+            ('core.kvstore, холодный LRU + пакет',
+             lambda: (local.prefetch_raw(keys), render(local)),
+             local._lru.clear),
+        ]
+        self.stdout.write(
+            f'Лента из {posts} постов, {iterations} повторов, '
+            f'среднее время поиска метаданных:'
+        )
+        for title, func, reset in cases:
+            elapsed = self.measure(func, reset, iterations)
+            self.stdout.write(f'  {title:<40} {elapsed * 1e6:10.1f} мкс')
@@ -0,0 +1,87 @@
+import multiprocessing
+import os
+import socket
+import time
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.jobs import Heartbeat, Scheduler, claim, execute
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет задачи из очереди в пуле потоков или процессов и '
+        'ставит в очередь периодические задачи из JOBS_PERIODIC.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.JOBS_WORKERS,
+            help='Размер пула; 0 — выполнять задачи в основном потоке.')
+        parser.add_argument(
+            '--processes', action='store_true',
+            help='Пул процессов вместо пула потоков.')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти.')
+
+    def executor(self, options):
+        workers = options['workers']
+        if not workers:
+            return None
+        if options['processes']:
+            # spawn, а не fork: дочерний процесс не должен унаследовать
+            # открытое соединение SQLite родителя.
+            return ProcessPoolExecutor(
+                workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        return ThreadPoolExecutor(workers, thread_name_prefix='jobs')
+
+    def handle(self, *args, **options):
+        self.worker = f'{socket.gethostname()}:{os.getpid()}'
+        self.scheduler = Scheduler(settings.JOBS_PERIODIC)
+        self.executed = 0
+        self.heartbeat = Heartbeat(self.worker)
+        self.heartbeat.beat()
+        self.heartbeat.start()
+        executor = self.executor(options)
+        try:
+            self.run(executor, max(options['workers'], 1), options['once'])
+        except KeyboardInterrupt:
+            self.stdout.write('Остановка: ждём выполняемые задачи.')
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+            self.heartbeat.stop()
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено задач: {self.executed}'))
+
+    def run(self, executor, slots, once):
+        running = {}
+        while True:
+            self.scheduler.tick()
+            for future in [future for future in running if future.done()]:
+                self.heartbeat.discard(running.pop(future))
+            claimed = claim(self.worker, slots - len(running))
+            for pk in claimed:
+                self.heartbeat.add(pk)
+                if executor is None:
+                    execute(pk)
+                    self.heartbeat.discard(pk)
+                else:
+                    running[executor.submit(execute, pk)] = pk
+            self.executed += len(claimed)
+            if claimed:
+                continue
+            if once and not running:
+                return
+            if running:
+                wait(running, settings.JOBS_POLL_INTERVAL, FIRST_COMPLETED)
+            else:
+                time.sleep(settings.JOBS_POLL_INTERVAL)
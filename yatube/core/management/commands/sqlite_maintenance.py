@@ -0,0 +1,82 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.sqlite import pragma
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+class Command(BaseCommand):
+    help = (
+        'Обслуживание базы SQLite без остановки сайта: проверка '
+        'целостности, ANALYZE, инкрементальный VACUUM и checkpoint WAL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--full-check', action='store_true',
+            help='integrity_check вместо быстрого quick_check.')
+        parser.add_argument(
+            '--vacuum-pages', type=int, default=0,
+            help='Сколько свободных страниц вернуть; 0 — все.')
+        parser.add_argument('--skip-analyze', action='store_true')
+        parser.add_argument('--skip-vacuum', action='store_true')
+        parser.add_argument(
+            '--enable-incremental-vacuum', action='store_true',
+            help='Включить auto_vacuum=INCREMENTAL полным VACUUM; '
+                 'блокирует запись на всё время работы.')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда работает только с SQLite.')
+        with connection.cursor() as cursor:
+            self.check_integrity(cursor, options['full_check'])
+            if not options['skip_analyze']:
+                cursor.execute('ANALYZE')
+                self.stdout.write('ANALYZE: статистика обновлена.')
+            if options['enable_incremental_vacuum']:
+                self.enable_incremental_vacuum(cursor)
+            elif not options['skip_vacuum']:
+                self.vacuum(cursor, options['vacuum_pages'])
+            self.checkpoint(cursor)
+        self.stdout.write(self.style.SUCCESS('Обслуживание завершено.'))
+
+    def check_integrity(self, cursor, full):
+        name = 'integrity_check' if full else 'quick_check'
+        cursor.execute(f'PRAGMA {name}')
+        problems = [row[0] for row in cursor.fetchall() if row[0] != 'ok']
+        if problems:
+            raise CommandError(
+                f'{name} нашёл ошибки:\n' + '\n'.join(problems))
+        self.stdout.write(f'{name}: ok')
+
+    def vacuum(self, cursor, pages):
+        if pragma(cursor, 'auto_vacuum') != AUTO_VACUUM_INCREMENTAL:
+            self.stdout.write(self.style.WARNING(
+                'Инкрементальный VACUUM выключен; включите его один раз '
+                'с --enable-incremental-vacuum.'))
+            return
+        before = pragma(cursor, 'freelist_count')
+        cursor.execute(f'PRAGMA incremental_vacuum({pages})')
+        cursor.fetchall()
+        freed = before - pragma(cursor, 'freelist_count')
+        self.stdout.write(
+            f'incremental_vacuum: освобождено страниц {freed} из {before}, '
+            f'{freed * pragma(cursor, "page_size") // 1024} КиБ.')
+
+    def enable_incremental_vacuum(self, cursor):
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        cursor.execute('VACUUM')
+        self.stdout.write('auto_vacuum=INCREMENTAL включён, VACUUM выполнен.')
+
+    def checkpoint(self, cursor):
+        cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        busy, log, checkpointed = cursor.fetchone()
+        if log < 0:
+            self.stdout.write('wal_checkpoint: база не в режиме WAL.')
+            return
+        self.stdout.write(
+            f'wal_checkpoint: перенесено страниц {checkpointed} из {log}'
+            + (', часть страниц занята читателями.' if busy else '.'))
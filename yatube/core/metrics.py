@@ -0,0 +1,351 @@
+import atexit
+import bisect
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# Метрики: имя -> (тип, описание). Гистограммы в секундах.
+METRICS = {
+    'yatube_request_duration_seconds': (
+        'histogram', 'Время обработки запроса представлением.'),
+    'yatube_db_duration_seconds': (
+        'histogram', 'Суммарное время запросов к базе за один запрос.'),
+    'yatube_template_duration_seconds': (
+        'histogram', 'Время отрисовки шаблонов за один запрос.'),
+    'yatube_db_queries_total': (
+        'counter', 'Число запросов к базе.'),
+    'yatube_cache_requests_total': (
+        'counter', 'Обращения к кэшу по результату: hit или miss.'),
+    'yatube_responses_total': (
+        'counter', 'Ответы по коду статуса.'),
+    'yatube_rate_limit_total': (
+        'counter', 'Решения ограничителя записи: allowed или исчерпанное '
+        'ведро (user, ip).'),
+}
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    """Счётчики одного запроса.
+
+    Экземпляр подключается к соединениям с базой как execute_wrapper,
+    поэтому каждый SQL-запрос проходит через __call__.
+    """
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.queries = 0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+    def server_timing(self, duration):
+        """Значение заголовка Server-Timing, длительности в миллисекундах."""
+        return ', '.join([
+            f'app;dur={duration * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="hit={self.cache_hits} miss={self.cache_misses}"',
+        ])
+
+
+def current():
+    """Счётчики запроса, который обрабатывается в этом потоке."""
+    return getattr(_local, 'metrics', None)
+
+
+@contextmanager
+def collect():
+    _local.metrics = request_metrics = RequestMetrics()
+    try:
+        yield request_metrics
+    finally:
+        _local.metrics = None
+
+
+@contextmanager
+def suspended():
+    """Не считать обращения к кэшу и шаблоны внутри блока."""
+    request_metrics, _local.metrics = current(), None
+    try:
+        yield
+    finally:
+        _local.metrics = request_metrics
+
+
+@contextmanager
+def template_timer():
+    """Время внешнего шаблона; вложенные отрисовки входят в него."""
+    request_metrics = current()
+    if request_metrics is None:
+        yield
+        return
+    request_metrics.template_depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        request_metrics.template_depth -= 1
+        if not request_metrics.template_depth:
+            request_metrics.template_time += time.perf_counter() - start
+
+
+def record_cache(hits, misses):
+    request_metrics = current()
+    if request_metrics is not None:
+        request_metrics.cache_hits += hits
+        request_metrics.cache_misses += misses
+
+
+class Registry:
+    """Агрегаты метрик процесса.
+
+    Каждый процесс держит свои счётчики в памяти и раз в
+    METRICS_FLUSH_INTERVAL секунд атомарно переписывает собственный
+    файл в METRICS_DIR. /metrics складывает файлы всех процессов, так
+    что работает при любом числе воркеров без общей памяти и блокировок.
+    """
+
+    def __init__(self, name=None):
+        self._lock = threading.Lock()
+        self._name = name
+        self._pid = os.getpid() if name else None
+        self._flushed = time.monotonic()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._counters = defaultdict(int)
+            self._histograms = {}
+
+    @property
+    def name(self):
+        # После fork у дочернего процесса должен быть свой файл.
+        if self._name is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._name = f'{self._pid}-{uuid.uuid4().hex[:8]}'
+        return self._name
+
+    def inc(self, metric, labels, value=1):
+        with self._lock:
+            self._counters[metric, labels] += value
+
+    def observe(self, metric, labels, value):
+        buckets = settings.METRICS_BUCKETS
+        with self._lock:
+            state = self._histograms.get((metric, labels))
+            if state is None:
+                state = self._histograms[metric, labels] = [
+                    [0] * (len(buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(buckets, value)] += 1
+            state[1] += value
+
+    def record(self, view, method, status, request_metrics, duration):
+        labels = (('view', view), ('method', method))
+        view_labels = (('view', view),)
+        self.observe('yatube_request_duration_seconds', labels, duration)
+        self.observe(
+            'yatube_db_duration_seconds', view_labels,
+            request_metrics.db_time)
+        self.observe(
+            'yatube_template_duration_seconds', view_labels,
+            request_metrics.template_time)
+        self.inc(
+            'yatube_db_queries_total', view_labels, request_metrics.queries)
+        for result, value in (('hit', request_metrics.cache_hits),
+                              ('miss', request_metrics.cache_misses)):
+            self.inc(
+                'yatube_cache_requests_total',
+                view_labels + (('result', result),), value)
+        self.inc('yatube_responses_total', (('status', str(status)),))
+        if time.monotonic() - self._flushed > settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    @property
+    def empty(self):
+        return not self._counters and not self._histograms
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [
+                    [metric, labels, value]
+                    for (metric, labels), value in self._counters.items()
+                ],
+                'histograms': [
+                    [metric, labels, counts[:], total]
+                    for (metric, labels), (counts, total)
+                    in self._histograms.items()
+                ],
+            }
+
+    def flush(self):
+        self._flushed = time.monotonic()
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = os.path.join(settings.METRICS_DIR, f'{self.name}.json')
+        with open(f'{path}.tmp', 'w') as file:
+            json.dump(self.snapshot(), file)
+        os.replace(f'{path}.tmp', path)
+
+
+registry = Registry()
+
+
+@atexit.register
+def _flush_on_exit():
+    if not registry.empty:
+        registry.flush()
+
+
+AGGREGATE = 'aggregate.json'
+
+
+def _merge(snapshot, counters, histograms):
+    for metric, labels, value in snapshot['counters']:
+        counters[metric, tuple(map(tuple, labels))] += value
+    for metric, labels, counts, total in snapshot['histograms']:
+        key = metric, tuple(map(tuple, labels))
+        state = histograms.setdefault(key, [[0] * len(counts), 0.0])
+        state[0] = [a + b for a, b in zip(state[0], counts)]
+        state[1] += total
+
+
+def _read(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def _process_alive(name):
+    """Жив ли процесс, записавший файл; чужие имена считаются живыми."""
+    try:
+        pid = int(name.split('-', 1)[0])
+    except ValueError:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def compact_processes(directory):
+    """Сливает файлы завершившихся процессов в aggregate.json и удаляет их.
+
+    Иначе каждый перезапуск оставлял бы в каталоге новый файл, а /metrics
+    перечитывал бы их все. В агрегате запоминаются имена слитых файлов:
+    если удалить их не успели, при следующем вызове они только
+    удаляются и не учитываются дважды. Проверка pid верна, пока каталог
+    не общий у нескольких машин.
+    """
+    if not os.path.isdir(directory):
+        return
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        path = os.path.join(directory, AGGREGATE)
+        aggregate = (_read(path) if os.path.exists(path)
+                     else {'counters': [], 'histograms': [], 'merged': []})
+        merged = set(aggregate['merged'])
+        dead = [
+            name for name in os.listdir(directory)
+            if name.endswith('.json') and name != AGGREGATE
+            and name not in merged and not _process_alive(name[:-5])
+        ]
+        if dead:
+            counters, histograms = defaultdict(int), {}
+            _merge(aggregate, counters, histograms)
+            for name in dead:
+                _merge(_read(os.path.join(directory, name)),
+                       counters, histograms)
+            aggregate = {**_snapshot(counters, histograms), 'merged': dead}
+            with open(f'{path}.tmp', 'w') as file:
+                json.dump(aggregate, file)
+            os.replace(f'{path}.tmp', path)
+        for name in merged | set(dead):
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+def _snapshot(counters, histograms):
+    return {
+        'counters': [
+            [metric, labels, value]
+            for (metric, labels), value in counters.items()
+        ],
+        'histograms': [
+            [metric, labels, counts, total]
+            for (metric, labels), (counts, total) in histograms.items()
+        ],
+    }
+
+
+def collect_processes(directory):
+    """Складывает снимки всех процессов из каталога метрик."""
+    compact_processes(directory)
+    counters = defaultdict(int)
+    histograms = {}
+    names = sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+    for name in names:
+        if name.endswith('.json'):
+            _merge(_read(os.path.join(directory, name)), counters, histograms)
+    return counters, histograms
+
+
+def _escape(value):
+    return (str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n'))
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+    return f'{{{pairs}}}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(counters, histograms):
+    """Текстовый формат экспозиции Prometheus 0.0.4."""
+    buckets = [*map(str, settings.METRICS_BUCKETS), '+Inf']
+    lines = []
+    for metric, (kind, help_text) in METRICS.items():
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} {kind}')
+        for (name, labels), value in sorted(counters.items()):
+            if name == metric:
+                lines.append(f'{metric}{_labels(labels)} {_number(value)}')
+        for (name, labels), (counts, total) in sorted(histograms.items()):
+            if name != metric:
+                continue
+            cumulative = 0
+            for le, count in zip(buckets, counts):
+                cumulative += count
+                lines.append(
+                    f'{metric}_bucket{_labels(labels + (("le", le),))} '
+                    f'{cumulative}')
+            lines.append(f'{metric}_sum{_labels(labels)} {_number(total)}')
+            lines.append(f'{metric}_count{_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,70 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, routers
+
+# Остальные методы сводятся к одной метке, чтобы не плодить серии.
+KNOWN_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+class MetricsMiddleware:
+    """Замеряет запрос и добавляет к ответу заголовок Server-Timing.
+
+    Время базы и число запросов снимаются execute_wrapper со всех
+    соединений, кэш и шаблоны считают MeteredCacheMixin и
+    MeteredDjangoTemplates. Итог по представлению уходит в гистограммы
+    metrics.registry. У потоковых ответов замеряется только подготовка,
+    без отдачи тела.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with metrics.collect() as request_metrics, ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(request_metrics))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+        match = getattr(request, 'resolver_match', None)
+        metrics.registry.record(
+            match.view_name if match else 'unresolved',
+            request.method if request.method in KNOWN_METHODS else 'OTHER',
+            response.status_code,
+            request_metrics,
+            duration,
+        )
+        response['Server-Timing'] = request_metrics.server_timing(duration)
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Включает чтение с реплик для GET и HEAD.
+
+    Запрос, который что-то записал, ставит cookie REPLICA_PIN_COOKIE на
+    REPLICA_PIN_SECONDS: следующие запросы этого пользователя, например
+    после редиректа из post_create или add_comment, читают основную
+    базу и видят свои изменения.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with routers.request_routing(
+            allow_replicas=request.method in ('GET', 'HEAD'),
+            pinned=settings.REPLICA_PIN_COOKIE in request.COOKIES,
+        ) as state:
+            response = self.get_response(request)
+        if state.wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -1,4 +1,18 @@
-from django.db import models
+from django.db import models, router, transaction
+from django.utils import timezone
+
+
+class AtomicSaveModel(models.Model):
+    """Сохраняет объект и обработчики post_save в одной транзакции."""
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(
+            self.__class__, instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+    class Meta:
+        abstract = True
 
 
 class CreatedModel(models.Model):
@@ -10,3 +24,56 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class Job(models.Model):
+    """Задача фоновой очереди, см. core.jobs."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Не выполнена'),
+    ]
+
+    task = models.CharField('Задача', max_length=100)
+    payload = models.TextField('Аргументы (JSON)', default='[]')
+    key = models.CharField(
+        'Ключ идемпотентности',
+        max_length=255,
+        unique=True,
+        null=True,
+        blank=True,
+    )
+    status = models.CharField(
+        'Состояние',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=QUEUED,
+    )
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveIntegerField('Максимум попыток')
+    run_at = models.DateTimeField('Выполнить после', default=timezone.now)
+    locked_by = models.CharField('Воркер', max_length=100, blank=True)
+    locked_until = models.DateTimeField(
+        'Захвачена до', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Дата создания', auto_now_add=True)
+    finished = models.DateTimeField('Завершена', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        # Воркер выбирает готовые задачи диапазоном по (status, run_at).
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'],
+                name='job_status_run_at_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.task} #{self.pk}'
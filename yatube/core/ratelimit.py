@@ -0,0 +1,104 @@
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import render
+
+from . import metrics
+
+KEY = 'ratelimit:{name}:{scope}:{ident}'
+
+
+def client_ip(request):
+    """Адрес клиента с учётом RATE_LIMIT_TRUSTED_PROXIES прокси перед сайтом.
+
+    Каждый прокси дописывает в конец RATE_LIMIT_IP_HEADER адрес, с
+    которого к нему пришли, поэтому клиентом считается адрес на
+    столько позиций от конца, сколько прокси мы контролируем. Всё левее
+    него мог прислать сам клиент. Без прокси или без заголовка нужного
+    размера берётся REMOTE_ADDR.
+    """
+    remote_addr = request.META.get('REMOTE_ADDR', '')
+    hops = settings.RATE_LIMIT_TRUSTED_PROXIES
+    if not hops:
+        return remote_addr
+    header = request.META.get(settings.RATE_LIMIT_IP_HEADER, '')
+    addresses = [address.strip() for address in header.split(',')]
+    addresses = [address for address in addresses if address]
+    if len(addresses) < hops:
+        return remote_addr
+    return addresses[-hops]
+
+
+def bucket_keys(name, request):
+    """Ключи вёдер запроса: по пользователю, если он вошёл, и по IP."""
+    scopes = {}
+    if request.user.is_authenticated:
+        scopes['user'] = request.user.pk
+    scopes['ip'] = client_ip(request)
+    return {
+        scope: KEY.format(name=name, scope=scope, ident=ident)
+        for scope, ident in scopes.items()
+    }
+
+
+def refill(state, capacity, period, now):
+    """Токены в ведре на момент now; пустое состояние — полное ведро."""
+    if state is None:
+        return capacity
+    tokens, stamp = state
+    return min(capacity, tokens + (now - stamp) * capacity / period)
+
+
+def admit(name, request):
+    """Забирает по токену из всех вёдер запроса.
+
+    Возвращает None, если запрос допущен, или (исчерпанное ведро,
+    секунды до следующего токена). Токен списывается только когда
+    хватает во всех вёдрах, иначе запросы, отбитые лимитом по IP,
+    тратили бы и бюджет пользователя. Чтение и запись состояния не
+    атомарны: при гонке параллельные запросы могут пройти сверх
+    ёмкости на единицы, но не накапливают долг.
+    """
+    budgets = settings.RATE_LIMITS[name]
+    keys = bucket_keys(name, request)
+    states = cache.get_many(keys.values())
+    now = time.time()
+    updates = {}
+    for scope, key in keys.items():
+        capacity, period = budgets[scope]
+        tokens = refill(states.get(key), capacity, period, now)
+        if tokens < 1:
+            return scope, (1 - tokens) * period / capacity
+        updates[key] = (tokens - 1, now)
+    for scope, key in keys.items():
+        cache.set(key, updates[key], budgets[scope][1])
+    return None
+
+
+def rate_limit(name, methods=('POST',)):
+    """Ограничивает запись ведром токенов RATE_LIMITS[name].
+
+    Лимит считается только для запросов с методами из methods; None —
+    для всех, как у подписок, которые меняют данные по GET. Сверх
+    лимита возвращается 429 с заголовком Retry-After.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if methods is not None and request.method not in methods:
+                return view(request, *args, **kwargs)
+            limited = admit(name, request)
+            result = limited[0] if limited else 'allowed'
+            metrics.registry.inc(
+                'yatube_rate_limit_total',
+                (('view', name), ('result', result)))
+            if limited is None:
+                return view(request, *args, **kwargs)
+            response = render(request, 'core/429.html', status=429)
+            response['Retry-After'] = str(math.ceil(limited[1]))
+            return response
+        return wrapper
+    return decorator
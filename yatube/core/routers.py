@@ -0,0 +1,75 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = threading.local()
+
+
+@contextmanager
+def request_routing(allow_replicas, pinned):
+    """Правила маршрутизации на время одного запроса.
+
+    allow_replicas — запрос только читает (GET/HEAD); pinned — недавно
+    был записан и должен видеть свои изменения, то есть читать основную
+    базу. После первой записи запрос тоже закрепляется за основной.
+    """
+    _state.allow_replicas = allow_replicas
+    _state.pinned = pinned
+    _state.wrote = False
+    _state.used_replica = False
+    try:
+        yield _state
+    finally:
+        _state.allow_replicas = False
+        _state.pinned = False
+
+
+def primary_pinned():
+    """Запрос обязан видеть свежие данные: кэши нельзя читать."""
+    return bool(settings.DATABASE_REPLICAS) and getattr(
+        _state, 'pinned', False)
+
+
+def cache_timeout(timeout):
+    """Срок кэширования данных, прочитанных в текущем запросе.
+
+    Реплика отстаёт от основной базы, и страница, собранная по ней
+    сразу после записи, не должна жить в кэше дольше
+    REPLICA_CACHE_TIMEOUT.
+    """
+    if getattr(_state, 'used_replica', False):
+        return min(timeout, settings.REPLICA_CACHE_TIMEOUT)
+    return timeout
+
+
+class ReplicaRouter:
+    """Отправляет чтения лент и постов на реплики из DATABASE_REPLICAS.
+
+    На реплики уходят только запросы к приложениям из
+    DATABASE_REPLICA_APPS внутри читающих HTTP-запросов; команды,
+    транзакции, сессии и пользователи всегда читают основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (not getattr(_state, 'allow_replicas', False)
+                or _state.pinned
+                or not settings.DATABASE_REPLICAS
+                or model._meta.app_label not in settings.DATABASE_REPLICA_APPS
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        _state.used_replica = True
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = _state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, связи между ними допустимы.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,42 @@
+from django.conf import settings
+
+# busy_timeout ставится первым: смена journal_mode ждёт блокировку.
+# auto_vacuum — до journal_mode: переход в WAL записывает заголовок
+# файла, и в новой базе режим вакуума уже не поменяется.
+PRAGMA_ORDER = ('busy_timeout', 'auto_vacuum', 'journal_mode',
+                'synchronous', 'cache_size', 'mmap_size')
+
+
+def pragma_statements(pragmas):
+    ordered = sorted(pragmas.items(), key=lambda item: (
+        PRAGMA_ORDER.index(item[0]) if item[0] in PRAGMA_ORDER
+        else len(PRAGMA_ORDER)))
+    return [f'PRAGMA {name} = {value}' for name, value in ordered]
+
+
+def apply_pragmas(cursor, pragmas=None):
+    """Выполняет PRAGMA из SQLITE_PRAGMAS на открытом соединении."""
+    if pragmas is None:
+        pragmas = settings.SQLITE_PRAGMAS
+    for statement in pragma_statements(pragmas):
+        cursor.execute(statement)
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Обработчик connection_created: настраивает каждое соединение SQLite.
+
+    journal_mode=WAL хранится в самом файле базы, остальные PRAGMA
+    действуют только на соединение, поэтому выполняются при каждом
+    подключении. auto_vacuum=INCREMENTAL применяется только к пустой
+    базе; для существующей его включает sqlite_maintenance
+    --enable-incremental-vacuum.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor)
+
+
+def pragma(cursor, name):
+    cursor.execute(f'PRAGMA {name}')
+    return cursor.fetchone()[0]
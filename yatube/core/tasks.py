@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import management
+from django.utils import timezone
+
+from .jobs import task
+from .models import Job
+
+
+@task('core.call_command')
+def call_command(name, *args):
+    """Команда manage.py по расписанию JOBS_PERIODIC."""
+    management.call_command(name, *args)
+
+
+@task('core.purge_jobs')
+def purge_jobs():
+    """Удаляет выполненные задачи старше JOBS_KEEP_DAYS.
+
+    Вместе с ними освобождаются их ключи идемпотентности. Упавшие
+    задачи остаются для разбора в админке.
+    """
+    Job.objects.filter(
+        status=Job.DONE,
+        finished__lt=timezone.now() - timedelta(days=settings.JOBS_KEEP_DAYS),
+    ).delete()
@@ -0,0 +1,48 @@
+import copy
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from . import metrics
+
+
+@contextmanager
+def isolated_storage():
+    """Кэш, KV-store миниатюр, загрузки и метрики тестов во временной папке.
+
+    Кэш и KV-store живут между запусками, а id в тестовой базе
+    начинаются заново: без отдельного каталога тесты видели бы чужие
+    страницы и метаданные и сбрасывали бы кэш работающего сервера.
+    Загруженные тестами картинки не попадают в MEDIA_ROOT, а метрики
+    тестовых запросов — в METRICS_DIR сайта.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        caches = copy.deepcopy(settings.CACHES)
+        for alias, options in caches.items():
+            if options['BACKEND'].endswith('FileBasedCache'):
+                options['LOCATION'] = f'{directory}/cache-{alias}'
+        with override_settings(
+            CACHES=caches,
+            MEDIA_ROOT=f'{directory}/media',
+            THUMBNAIL_KVSTORE_PATH=f'{directory}/kvstore.sqlite3',
+            METRICS_DIR=f'{directory}/metrics',
+        ):
+            try:
+                yield
+            finally:
+                # Иначе atexit сбросит накопленное в настоящий каталог.
+                metrics.registry.clear()
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._storage = isolated_storage()
+        self._storage.__enter__()
+
+    def teardown_test_environment(self, **kwargs):
+        self._storage.__exit__(None, None, None)
+        super().teardown_test_environment(**kwargs)
@@ -1,4 +1,10 @@
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+
+from . import metrics
 
 
 def page_not_found(request, exception):
@@ -15,3 +21,27 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+def has_metrics_access(request):
+    """Доступ к /metrics: персонал или заголовок Bearer METRICS_TOKEN."""
+    if request.user.is_staff:
+        return True
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    scheme, _, token = header.partition(' ')
+    return bool(
+        settings.METRICS_TOKEN
+        and scheme.lower() == 'bearer'
+        and constant_time_compare(token, settings.METRICS_TOKEN)
+    )
+
+
+def metrics_view(request):
+    if not has_metrics_access(request):
+        raise PermissionDenied
+    metrics.registry.flush()
+    counters, histograms = metrics.collect_processes(settings.METRICS_DIR)
+    return HttpResponse(
+        metrics.render_prometheus(counters, histograms),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -1,6 +1,54 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.helpers import ActionForm
 
+from .cache_versions import bump_feed_versions, feed_key
+from .exporter import Export
 from .models import Comment, Group, Post
+from .page_cache import forget_lookups
+from .search import match_expression, matching_ids
+from .utils import EstimatedCountPaginator
+
+
+class FullTextSearchMixin:
+    """Поиск в админке по индексу FTS5 вместо LIKE '%...%' по search_fields.
+
+    search_fields остаются только для того, чтобы админка показала поле
+    поиска.
+    """
+
+    search_index = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not match_expression(search_term):
+            return queryset, False
+        return queryset.filter(
+            pk__in=matching_ids(self.search_index, search_term)), False
+
+
+class PerformanceMixin:
+    """Настройки списков админки для таблиц на миллионы строк.
+
+    Число строк оценивается EstimatedCountPaginator, общий COUNT(*)
+    рядом с результатами поиска не считается, а навигация по датам идёт
+    по индексированному created.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    date_hierarchy = 'created'
+
+
+class ExportMixin:
+    """Действия, которые потоком выгружают выбранные строки."""
+
+    def export_jsonl(self, request, queryset):
+        return Export(queryset, compress=True).response()
+    export_jsonl.short_description = 'Выгрузить в JSONL (gzip)'
+
+    def export_csv(self, request, queryset):
+        return Export(queryset, format='csv').response()
+    export_csv.short_description = 'Выгрузить в CSV'
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -9,7 +57,7 @@ class GroupAdmin(admin.ModelAdmin):
         'slug',
         'description',
     )
-    search_fields = ('text', 'description',)
+    search_fields = ('title', 'description',)
     list_filter = ('title',)
     empty_value_display = '-пусто-'
 
@@ -17,7 +65,17 @@ class GroupAdmin(admin.ModelAdmin):
 admin.site.register(Group, GroupAdmin)
 
 
-class PostAdmin(admin.ModelAdmin):
+class PostActionForm(ActionForm):
+    group = forms.ModelChoiceField(
+        Group.objects.all(),
+        required=False,
+        label='Группа',
+        empty_label='без группы',
+    )
+
+
+class PostAdmin(PerformanceMixin, FullTextSearchMixin, ExportMixin,
+                admin.ModelAdmin):
     list_display = (
         'pk',
         'text',
@@ -25,16 +83,42 @@ class PostAdmin(admin.ModelAdmin):
         'author',
         'group',
     )
-    list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
+    search_index = 'posts_post_fts'
     list_filter = ('created', 'group',)
     empty_value_display = '-пусто-'
+    action_form = PostActionForm
+    actions = ('move_to_group', 'export_jsonl', 'export_csv')
+
+    def move_to_group(self, request, queryset):
+        """Переносит посты одним UPDATE, без загрузки и save() каждого."""
+        group_id = request.POST.get('group') or None
+        rows = queryset.order_by().values_list('author_id', 'group_id')
+        author_ids, group_ids = set(), {group_id}
+        for author_id, old_group_id in rows.distinct().iterator():
+            author_ids.add(author_id)
+            group_ids.add(old_group_id)
+        post_ids = list(
+            queryset.order_by().values_list('pk', flat=True).iterator())
+        updated = queryset.update(group_id=group_id)
+        # update() не вызывает сигналы, поэтому ленты сбрасываем сами.
+        forget_lookups('post', post_ids)
+        bump_feed_versions(
+            'index',
+            *(feed_key('author', author_id) for author_id in author_ids),
+            *(feed_key('group', pk) for pk in group_ids if pk is not None),
+        )
+        self.message_user(request, f'Перенесено постов: {updated}')
+    move_to_group.short_description = 'Перенести в группу'
 
 
 admin.site.register(Post, PostAdmin)
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(PerformanceMixin, FullTextSearchMixin, ExportMixin,
+                   admin.ModelAdmin):
     list_display = (
         'pk',
         'text',
@@ -43,8 +127,12 @@ class CommentAdmin(admin.ModelAdmin):
         'author',
     )
     search_fields = ('text',)
-    list_filter = ('created', 'post',)
+    search_index = 'posts_comment_fts'
+    list_select_related = ('author', 'post')
+    autocomplete_fields = ('author', 'post')
+    list_filter = ('created',)
     empty_value_display = '-пусто-'
+    actions = ('export_jsonl', 'export_csv')
 
 
 admin.site.register(Comment, CommentAdmin)
@@ -0,0 +1,230 @@
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import JsonResponse
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_safe
+
+from .models import Comment, Group, Post, TimelineEntry, User
+from .page_cache import (cached_lookup, conditional_page, follow_page_feeds,
+                         group_page_feeds, index_page_feeds, post_page_feeds,
+                         profile_page_feeds)
+from .utils import CURSOR_NEXT, decode_cursor, encode_cursor
+
+# Поле ответа -> путь для values_list(). Модели не создаются: строки
+# ответа собираются прямо из кортежей.
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'image': 'image',
+    'comment_count': 'comment_count',
+    'author': 'author__username',
+    'group': 'group__slug',
+}
+# Лента подписок читается по индексу (user, created) таблицы лент.
+TIMELINE_FIELDS = {
+    **{name: f'post__{path}' for name, path in POST_FIELDS.items()},
+    'id': 'post_id',
+    'created': 'created',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+
+
+def media_url(name):
+    return f'{settings.MEDIA_URL}{name}' if name else None
+
+
+CONVERTERS = {'image': media_url}
+
+
+class APIError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def api_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={
+        'ensure_ascii': False,
+        'separators': (',', ':'),
+    })
+
+
+def api_view(view):
+    """GET/HEAD, gzip и ошибки в виде {"error": ...}."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except APIError as error:
+            return api_response({'error': str(error)}, error.status)
+    return require_safe(gzip_page(wrapper))
+
+
+def api_login_required(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return api_response({'error': 'Нужна авторизация.'}, 401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def projection(request, fields):
+    """Поля из ?fields=a,b в порядке запроса; по умолчанию все."""
+    names = [name for name in request.GET.get('fields', '').split(',')
+             if name]
+    unknown = set(names) - set(fields)
+    if unknown:
+        raise APIError(f'Неизвестные поля: {", ".join(sorted(unknown))}.')
+    return names or list(fields)
+
+
+def page_limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.AMOUNT_OF_POSTS))
+    except ValueError:
+        raise APIError('limit должен быть числом.')
+    return max(1, min(limit, settings.API_MAX_LIMIT))
+
+
+def rows(queryset, names, fields):
+    """Словари ответа из values_list() по выбранным полям."""
+    paths = [fields[name] for name in names]
+    converters = [CONVERTERS.get(name) for name in names]
+    for values in queryset.values_list(*paths):
+        yield {
+            name: convert(value) if convert else value
+            for name, convert, value in zip(names, converters, values)
+        }
+
+
+def feed(request, queryset, fields):
+    """Страница ленты после курсора (created, id).
+
+    Поля ключа выбираются всегда и убираются из ответа, если их не
+    просили.
+    """
+    names = projection(request, fields)
+    limit = page_limit(request)
+    token = request.GET.get('cursor')
+    if token:
+        cursor = decode_cursor(token)
+        if cursor is None:
+            raise APIError('Неверный курсор.')
+        _, _, created, key = cursor
+        queryset = queryset.filter(
+            Q(created__lt=created)
+            | Q(created=created, **{f'{fields["id"]}__lt': key}))
+    queryset = queryset.order_by('-created', f'-{fields["id"]}')
+    keys = ['id', 'created']
+    selected = names + [key for key in keys if key not in names]
+    results = list(rows(queryset[:limit + 1], selected, fields))
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        last = results[-1]
+        next_cursor = encode_cursor(
+            CURSOR_NEXT, 1, last['created'].isoformat(), last['id'])
+    for result in results:
+        for key in keys:
+            if key not in names:
+                del result[key]
+    return api_response({'results': results, 'next': next_cursor})
+
+
+def lookup(kind, value, queryset, *fields):
+    """Строка из page_cache.cached_lookup или ответ 404.
+
+    Поля должны совпадать с теми, что запрашивают функции лент в
+    page_cache: у них общий ключ кэша.
+    """
+    row = cached_lookup(kind, value, queryset, *fields)
+    if row is None:
+        raise APIError('Не найдено.', 404)
+    return row
+
+
+def batch(request, ids):
+    """Посты по списку id в порядке запроса; ненайденные пропускаются."""
+    try:
+        ids = [int(pk) for pk in ids.split(',') if pk]
+    except ValueError:
+        raise APIError('ids должен быть списком чисел через запятую.')
+    if len(ids) > settings.API_MAX_IDS:
+        raise APIError(f'Не больше {settings.API_MAX_IDS} id за запрос.')
+    names = projection(request, POST_FIELDS)
+    selected = names if 'id' in names else names + ['id']
+    found = {
+        row['id']: row
+        for row in rows(Post.objects.filter(pk__in=ids), selected, POST_FIELDS)
+    }
+    results = [found[pk] for pk in dict.fromkeys(ids) if pk in found]
+    if 'id' not in names:
+        for result in results:
+            del result['id']
+    return api_response({'results': results})
+
+
+@api_view
+@conditional_page(index_page_feeds, personalized=False)
+def posts(request):
+    ids = request.GET.get('ids')
+    if ids is not None:
+        return batch(request, ids)
+    return feed(request, Post.objects.all(), POST_FIELDS)
+
+
+@api_view
+@conditional_page(group_page_feeds, personalized=False)
+def group_posts(request, slug):
+    group_id, = lookup('group', slug, Group.objects.filter(slug=slug), 'pk')
+    return feed(request, Post.objects.filter(group_id=group_id), POST_FIELDS)
+
+
+@api_view
+@conditional_page(profile_page_feeds, personalized=False)
+def profile_posts(request, username):
+    author_id, = lookup(
+        'user', username, User.objects.filter(username=username), 'pk')
+    return feed(
+        request, Post.objects.filter(author_id=author_id), POST_FIELDS)
+
+
+@api_view
+@api_login_required
+@conditional_page(follow_page_feeds)
+def follow_posts(request):
+    return feed(
+        request,
+        TimelineEntry.objects.filter(user=request.user),
+        TIMELINE_FIELDS,
+    )
+
+
+@api_view
+@conditional_page(post_page_feeds, personalized=False)
+def post(request, post_id):
+    names = projection(request, POST_FIELDS)
+    result = next(
+        rows(Post.objects.filter(pk=post_id), names, POST_FIELDS), None)
+    if result is None:
+        raise APIError('Не найдено.', 404)
+    return api_response(result)
+
+
+@api_view
+@conditional_page(post_page_feeds, personalized=False)
+def post_comments(request, post_id):
+    lookup('post', post_id, Post.objects.filter(pk=post_id),
+           'author_id', 'group_id')
+    return feed(
+        request, Comment.objects.filter(post_id=post_id), COMMENT_FIELDS)
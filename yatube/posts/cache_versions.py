@@ -0,0 +1,70 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'feed-version:{}'
+MODIFIED_KEY = 'feed-modified:{}'
+
+
+def feed_key(*parts):
+    return ':'.join(str(part) for part in parts)
+
+
+def feed_version(feed):
+    """Текущая версия ленты; входит в ключи кэшированных фрагментов."""
+    key = VERSION_KEY.format(feed)
+    version = cache.get(key)
+    if version is None:
+        # Начинаем с текущего времени, чтобы после вытеснения ключа из
+        # кэша версия не совпала с уже использованной.
+        cache.add(key, time.time_ns(), None)
+        cache.add(MODIFIED_KEY.format(feed), int(time.time()), None)
+        version = cache.get(key)
+    return version
+
+
+def now_and_on_commit(func, *args):
+    """Выполняет сброс кэша сейчас и ещё раз после коммита транзакции.
+
+    До коммита другие запросы читают старый снимок базы и могут
+    положить собранное по нему под уже новую версию ключа. Повторный
+    сброс после коммита делает такие копии недостижимыми.
+    """
+    func(*args)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: func(*args))
+
+
+def bump_feed_versions(*feeds):
+    """Делает устаревшими все закэшированные фрагменты этих лент."""
+    now_and_on_commit(_bump_feed_versions, feeds)
+
+
+def _bump_feed_versions(feeds):
+    for feed in feeds:
+        key = VERSION_KEY.format(feed)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+    now = int(time.time())
+    cache.set_many({MODIFIED_KEY.format(feed): now for feed in feeds}, None)
+
+
+def feeds_modified(feeds):
+    """Unix-время последнего изменения лент или None, если оно неизвестно."""
+    keys = {MODIFIED_KEY.format(feed) for feed in feeds}
+    values = cache.get_many(keys)
+    if len(values) != len(keys):
+        return None
+    return max(values.values())
+
+
+def post_feeds(author_id, *group_ids):
+    feeds = ['index', feed_key('author', author_id)]
+    feeds.extend(
+        feed_key('group', group_id)
+        for group_id in set(group_ids) if group_id is not None
+    )
+    return feeds
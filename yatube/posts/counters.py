@@ -0,0 +1,73 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, User, UserCounters
+
+
+def change_user_counters(user_id, **deltas):
+    """Сдвигает счётчики пользователя на заданные величины."""
+    UserCounters.objects.filter(user_id=user_id).update(**{
+        name: Greatest(F(name) + delta, 0)
+        for name, delta in deltas.items()
+    })
+
+
+def change_comment_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=Greatest(F('comment_count') + delta, 0)
+    )
+
+
+def _count(model, field, outer='pk'):
+    rows = model.objects.filter(**{field: OuterRef(outer)}).order_by()
+    return Coalesce(
+        Subquery(
+            rows.values(field).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def reconcile_post_counters():
+    """Исправляет comment_count у постов; возвращает число исправлений."""
+    drifted = Post.objects.annotate(
+        actual=_count(Comment, 'post'),
+    ).exclude(comment_count=F('actual')).values_list('pk', 'actual')
+    fixed = 0
+    for post_id, actual in drifted.iterator():
+        Post.objects.filter(pk=post_id).update(comment_count=actual)
+        fixed += 1
+    return fixed
+
+
+def reconcile_user_counters():
+    """Создаёт недостающие счётчики пользователей и исправляет их значения.
+
+    Возвращает число созданных и исправленных строк.
+    """
+    missing = User.objects.filter(counters__isnull=True).values_list(
+        'pk', flat=True)
+    created = len(UserCounters.objects.bulk_create(
+        UserCounters(user_id=user_id) for user_id in missing
+    ))
+    drifted = UserCounters.objects.annotate(
+        actual_posts=_count(Post, 'author', 'user_id'),
+        actual_followers=_count(Follow, 'author', 'user_id'),
+        actual_following=_count(Follow, 'user', 'user_id'),
+    ).exclude(
+        posts_count=F('actual_posts'),
+        followers_count=F('actual_followers'),
+        following_count=F('actual_following'),
+    ).values_list(
+        'user_id', 'actual_posts', 'actual_followers', 'actual_following',
+    )
+    fixed = 0
+    for user_id, posts, followers, following in drifted.iterator():
+        UserCounters.objects.filter(user_id=user_id).update(
+            posts_count=posts,
+            followers_count=followers,
+            following_count=following,
+        )
+        fixed += 1
+    return created, fixed
@@ -0,0 +1,116 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from .models import Comment, Follow, Post
+
+EXPORT_FIELDS = {
+    Post: ('id', 'created', 'author_id', 'group_id', 'text', 'image'),
+    Comment: ('id', 'created', 'post_id', 'author_id', 'text'),
+    Follow: ('id', 'user_id', 'author_id'),
+}
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class Export:
+    """Потоковая выгрузка таблицы в JSONL или CSV.
+
+    Строки выбираются пачками по первичному ключу (WHERE id > последний
+    LIMIT n), поэтому в памяти всегда не больше одной пачки и одного
+    блока вывода. Каждый блок при gzip сжимается отдельным членом
+    gzip-потока: файл можно дописывать с места обрыва, а cursor после
+    каждого блока указывает id последней выгруженной строки.
+    """
+
+    def __init__(self, queryset, format='jsonl', compress=False,
+                 after=None, header=True):
+        self.queryset = queryset
+        self.fields = EXPORT_FIELDS[queryset.model]
+        self.format = format
+        self.compress = compress
+        self.header = header
+        self.cursor = after
+        self.count = 0
+        self._read_cursor = after
+        self._read_count = 0
+
+    @property
+    def filename(self):
+        name = f'{self.queryset.model._meta.model_name}s.{self.format}'
+        return f'{name}.gz' if self.compress else name
+
+    def rows(self):
+        queryset = self.queryset.order_by('pk').values_list(*self.fields)
+        after = self.cursor
+        while True:
+            chunk = queryset if after is None else queryset.filter(
+                pk__gt=after)
+            chunk = list(chunk[:settings.EXPORT_CHUNK_SIZE])
+            if not chunk:
+                return
+            for row in chunk:
+                self._read_cursor = row[0]
+                self._read_count += 1
+                yield [export_value(value) for value in row]
+            after = chunk[-1][0]
+
+    def jsonl_lines(self):
+        for row in self.rows():
+            yield json.dumps(
+                dict(zip(self.fields, row)), ensure_ascii=False) + '\n'
+
+    def csv_lines(self):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if self.header:
+            writer.writerow(self.fields)
+        for row in self.rows():
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    def lines(self):
+        if self.format == 'csv':
+            return self.csv_lines()
+        return self.jsonl_lines()
+
+    def __iter__(self):
+        block, size = [], 0
+        for line in self.lines():
+            block.append(line)
+            size += len(line)
+            if size >= settings.EXPORT_BLOCK_SIZE:
+                yield self.flush(block)
+                block, size = [], 0
+        if block:
+            yield self.flush(block)
+
+    def flush(self, block):
+        # Генератор строк стоит сразу после последней строки блока.
+        self.cursor, self.count = self._read_cursor, self._read_count
+        data = ''.join(block).encode()
+        return gzip.compress(data) if self.compress else data
+
+    def response(self):
+        content_type = (
+            'application/gzip' if self.compress
+            else CONTENT_TYPES[self.format]
+        )
+        response = StreamingHttpResponse(self, content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="{self.filename}"')
+        return response
@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.forms import ModelForm
 
 from .models import Comment, Post
@@ -8,6 +10,51 @@ class PostForm(ModelForm):
         model = Post
         fields = ('text', 'group', 'image',)
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Обрезанный LimitedUploadHandler файл не отдаём ImageField:
+        # вместо «повреждённой картинки» покажем понятную ошибку.
+        self.image_too_large = getattr(
+            self.files.get('image'), 'too_large', False)
+        if self.image_too_large:
+            self.files = self.files.copy()
+            del self.files['image']
+
+    def clean_image(self):
+        """Проверяет формат и размеры по уже прочитанному заголовку.
+
+        ImageField открывает картинку лениво и не декодирует пиксели,
+        уменьшение и перекодирование делает posts.images после сохранения.
+        """
+        image = self.cleaned_data['image']
+        header = getattr(image, 'image', None)
+        if header is None:
+            return image
+        if header.format not in settings.POST_IMAGE_FORMATS:
+            raise ValidationError(
+                'Поддерживаются форматы: %(formats)s.',
+                code='invalid_format',
+                params={'formats': ', '.join(settings.POST_IMAGE_FORMATS)},
+            )
+        width, height = header.size
+        if width * height > settings.POST_IMAGE_MAX_PIXELS:
+            raise ValidationError(
+                'Слишком большое изображение: %(width)s×%(height)s пикселей.',
+                code='too_many_pixels',
+                params={'width': width, 'height': height},
+            )
+        return image
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.image_too_large:
+            self.add_error('image', ValidationError(
+                'Файл больше %(limit)s МБ.',
+                code='too_large',
+                params={'limit': settings.UPLOAD_MAX_SIZE // 2 ** 20},
+            ))
+        return cleaned_data
+
 
 class CommentForm(ModelForm):
     class Meta:
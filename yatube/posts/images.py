@@ -0,0 +1,77 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+EXIF_ORIENTATION = 0x0112
+SAVE_OPTIONS = {
+    'JPEG': {'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'method': 4},
+}
+
+_pool = None
+_lock = threading.Lock()
+
+
+def normalize_image_file(path, max_size, quality):
+    """Уменьшает картинку до max_size по большей стороне и пересохраняет.
+
+    Картинка меньше предела без поворота в EXIF не трогается. Функция
+    работает в отдельном процессе, поэтому получает только путь и числа.
+    Возвращает True, если файл был перезаписан.
+    """
+    with Image.open(path) as image:
+        if getattr(image, 'is_animated', False):
+            return False
+        orientation = image.getexif().get(EXIF_ORIENTATION, 1)
+        if max(image.size) <= max_size and orientation == 1:
+            return False
+        image_format = image.format
+        # JPEG сразу декодируется в уменьшенном масштабе.
+        image.draft(None, (max_size, max_size))
+        normalized = ImageOps.exif_transpose(image)
+        normalized.thumbnail((max_size, max_size), Image.LANCZOS)
+    options = dict(SAVE_OPTIONS.get(image_format, {}))
+    if image_format in ('JPEG', 'WEBP'):
+        options['quality'] = quality
+    temporary = f'{path}.normalizing'
+    try:
+        normalized.save(temporary, format=image_format, **options)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    return True
+
+
+def get_process_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_PROCESSES,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+    return _pool
+
+
+def normalize_image(name):
+    """Нормализует загруженный оригинал в пуле процессов.
+
+    Декодирование больших фотографий упирается в процессор и держит GIL,
+    поэтому оно не делит процесс с потоками, отдающими страницы. При
+    IMAGE_PROCESSES = 0 работа идёт в текущем процессе.
+    """
+    try:
+        path = default_storage.path(name)
+    except NotImplementedError:
+        return False
+    args = (path, settings.POST_IMAGE_MAX_SIZE, settings.POST_IMAGE_QUALITY)
+    if not settings.IMAGE_PROCESSES:
+        return normalize_image_file(*args)
+    return get_process_pool().submit(normalize_image_file, *args).result()
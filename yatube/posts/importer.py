@@ -0,0 +1,208 @@
+import json
+import tempfile
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.db import connection, reset_queries, transaction
+
+# Порядок загрузки: каждая модель ссылается только на уже загруженные.
+IMPORT_ORDER = (
+    'posts.group',
+    'auth.user',
+    'posts.post',
+    'posts.comment',
+    'posts.follow',
+)
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = ' \t\r\n'
+
+
+class JSONArrayReader:
+    """Разбирает JSON-массив по элементам, читая файл кусками.
+
+    В памяти держится только текущий кусок и разбираемый объект, так что
+    потребление не зависит от размера файла.
+    """
+
+    def __init__(self, stream, chunk_size=CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def read_more(self):
+        chunk = self.stream.read(self.chunk_size)
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        self.eof = not chunk
+
+    def next_char(self, skip):
+        while True:
+            while (self.position < len(self.buffer)
+                   and self.buffer[self.position] in skip):
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if self.eof:
+                raise ValueError('Файл оборвался до конца JSON-массива.')
+            self.read_more()
+
+    def __iter__(self):
+        if self.next_char(WHITESPACE) != '[':
+            raise ValueError('Фикстура должна быть JSON-массивом.')
+        self.position += 1
+        while self.next_char(WHITESPACE + ',') != ']':
+            try:
+                obj, self.position = self.decoder.raw_decode(
+                    self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self.read_more()
+                continue
+            yield obj
+
+
+def iter_json_array(stream, chunk_size=CHUNK_SIZE):
+    return iter(JSONArrayReader(stream, chunk_size))
+
+
+def spool_by_model(stream):
+    """Раскладывает объекты фикстуры по временным файлам моделей.
+
+    Возвращает открытые на чтение файлы в порядке IMPORT_ORDER и счётчик
+    пропущенных объектов других моделей.
+    """
+    spools = {
+        label: tempfile.TemporaryFile('w+', encoding='utf-8')
+        for label in IMPORT_ORDER
+    }
+    skipped = Counter()
+    for obj in iter_json_array(stream):
+        label = obj['model'].lower()
+        spool = spools.get(label)
+        if spool is None:
+            skipped[label] += 1
+            continue
+        spool.write(json.dumps([obj.get('pk'), obj['fields']]))
+        spool.write('\n')
+    for spool in spools.values():
+        spool.seek(0)
+    return spools, skipped
+
+
+def resolve_natural_keys(model, keys):
+    """id объектов model по натуральным ключам; один запрос для User."""
+    username_field = getattr(model, 'USERNAME_FIELD', None)
+    if username_field is not None:
+        rows = model._default_manager.filter(**{
+            f'{username_field}__in': [key[0] for key in keys],
+        }).values_list(username_field, 'pk')
+        return {(name,): pk for name, pk in rows}
+    return {
+        key: model._default_manager.get_by_natural_key(*key).pk
+        for key in keys
+    }
+
+
+def build_batch(model, rows):
+    """Превращает строки фикстуры в несохранённые объекты и связи M2M."""
+    wanted = defaultdict(set)
+    for _, fields in rows:
+        for name, value in fields.items():
+            field = model._meta.get_field(name)
+            if field.many_to_one and isinstance(value, list):
+                wanted[field.related_model].add(tuple(value))
+            elif field.many_to_many:
+                wanted[field.related_model].update(
+                    tuple(target) for target in value
+                    if isinstance(target, list)
+                )
+    natural = {
+        related: resolve_natural_keys(related, keys)
+        for related, keys in wanted.items()
+    }
+    objects, relations = [], defaultdict(list)
+    for pk, fields in rows:
+        values = {}
+        for name, value in fields.items():
+            field = model._meta.get_field(name)
+            if field.many_to_many:
+                relations[field].extend(
+                    (pk, natural[field.related_model][tuple(target)]
+                     if isinstance(target, list) else target)
+                    for target in value
+                )
+            elif field.many_to_one:
+                if isinstance(value, list):
+                    value = natural[field.related_model][tuple(value)]
+                values[field.attname] = value
+            else:
+                values[field.attname] = field.to_python(value)
+        objects.append(model(pk=pk, **values))
+    return objects, relations
+
+
+def insert_raw(model, objects):
+    """INSERT как в loaddata: raw=True сохраняет значения auto_now_add.
+
+    bulk_create подставил бы в created текущее время, а сигналы нам здесь
+    не нужны, поэтому вставляем через _insert. Уже существующие строки
+    остаются как есть.
+    """
+    fields = model._meta.local_concrete_fields
+    size = connection.ops.bulk_batch_size(fields, objects) or len(objects)
+    for start in range(0, len(objects), size):
+        model._base_manager._insert(
+            objects[start:start + size],
+            fields=fields,
+            raw=True,
+            ignore_conflicts=True,
+        )
+
+
+def reset_sequences(model):
+    """Сдвигает автоинкремент за id, вставленные явно."""
+    sequences = connection.ops.sequence_reset_sql(no_style(), [model])
+    if sequences:
+        with connection.cursor() as cursor:
+            for sql in sequences:
+                cursor.execute(sql)
+
+
+def save_batch(model, objects, relations):
+    with transaction.atomic():
+        insert_raw(model, objects)
+        for field, pairs in relations.items():
+            through = field.remote_field.through
+            source = field.m2m_field_name()
+            target = field.m2m_reverse_field_name()
+            through._default_manager.bulk_create(
+                [
+                    through(**{
+                        f'{source}_id': pk,
+                        f'{target}_id': value,
+                    })
+                    for pk, value in pairs
+                ],
+                ignore_conflicts=True,
+            )
+
+
+def import_spool(label, spool, batch_size):
+    """Загружает строки одной модели пачками; отдаёт размер каждой пачки."""
+    model = apps.get_model(label)
+    while True:
+        lines = list(islice(spool, batch_size))
+        if not lines:
+            break
+        rows = [json.loads(line) for line in lines]
+        save_batch(model, *build_batch(model, rows))
+        # При DEBUG = True Django копит тексты всех запросов.
+        reset_queries()
+        yield len(rows)
+    reset_sequences(model)
@@ -0,0 +1,94 @@
+import gzip
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post
+
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время ответа и размер HTML-страниц и JSON API для '
+        'тех же лент и постов. Кэш отключён, чтобы каждый запрос '
+        'собирал ответ заново.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+
+    def pairs(self):
+        """(название, адрес страницы, адрес API, пользователь или None)."""
+        post = Post.objects.order_by('-comment_count', '-pk').first()
+        if post is None:
+            raise CommandError(
+                'В базе нет постов: сначала выполните generate_dataset.')
+        username = post.author.username
+        pairs = [
+            ('index', reverse('posts:index'), reverse('posts:api_posts'),
+             None),
+            ('profile', reverse('posts:profile', args=[username]),
+             reverse('posts:api_profile_posts', args=[username]), None),
+            ('post', reverse('posts:post_detail', args=[post.pk]),
+             reverse('posts:api_post', args=[post.pk]), None),
+            ('comments', reverse('posts:post_comments', args=[post.pk]),
+             reverse('posts:api_post_comments', args=[post.pk]), None),
+        ]
+        if post.group is not None:
+            slug = post.group.slug
+            pairs.append((
+                'group', reverse('posts:group_list', args=[slug]),
+                reverse('posts:api_group_posts', args=[slug]), None))
+        follow = Follow.objects.select_related('user').first()
+        if follow is not None:
+            pairs.append((
+                'follow', reverse('posts:follow_index'),
+                reverse('posts:api_follow'), follow.user))
+        return pairs
+
+    def measure(self, client, url, count):
+        """Медиана времени в мс, размер ответа и размер после gzip."""
+        timings = []
+        for _ in range(count):
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            raise CommandError(f'{url}: ответ {response.status_code}.')
+        content = response.content
+        return (statistics.median(timings) * 1000, len(content),
+                len(gzip.compress(content)))
+
+    def handle(self, *args, **options):
+        count = max(1, options['requests'])
+        # Сессии входа откатываются вместе с транзакцией.
+        with override_settings(CACHES=NO_CACHE), transaction.atomic():
+            results = []
+            for name, page_url, api_url, user in self.pairs():
+                client = Client()
+                if user is not None:
+                    client.force_login(user)
+                results.append((
+                    name,
+                    self.measure(client, page_url, count),
+                    self.measure(client, api_url, count),
+                ))
+            transaction.set_rollback(True)
+        self.stdout.write(
+            f'{"":<10}{"HTML мс":>9}{"API мс":>9}'
+            f'{"HTML байт":>11}{"API байт":>10}{"HTML gzip":>11}'
+            f'{"API gzip":>10}')
+        for name, page, api in results:
+            self.stdout.write(
+                f'{name:<10}{page[0]:9.2f}{api[0]:9.2f}'
+                f'{page[1]:11}{api[1]:10}{page[2]:11}{api[2]:10}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Запросов на адрес: {count}.'))
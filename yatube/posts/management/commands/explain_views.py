@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from posts.query_plans import collect_problems, view_urls
+
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет EXPLAIN QUERY PLAN для всех SELECT, которые делают '
+        'страницы сайта, и ищет сортировки во временном B-дереве и '
+        'полные проходы по таблицам.'
+    )
+
+    def handle(self, *args, **options):
+        # Без кэша выполняются все запросы страниц, а сессии входа
+        # откатываются вместе с транзакцией.
+        with override_settings(CACHES=NO_CACHE), transaction.atomic():
+            urls = view_urls()
+            problems = collect_problems(urls)
+            transaction.set_rollback(True)
+        if not urls:
+            raise CommandError(
+                'В базе нет постов: сначала выполните generate_dataset.')
+        for url, sql, flagged in problems:
+            self.stdout.write(
+                self.style.WARNING(f'{url}: {"; ".join(flagged)}'))
+            self.stdout.write(f'  {sql}')
+        if problems:
+            raise CommandError(f'Проблемных запросов: {len(problems)}.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено страниц: {len(urls)}, проблем не найдено.'))
@@ -0,0 +1,116 @@
+import os
+import sys
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from posts.exporter import Export
+from posts.models import Comment, Follow, Post
+
+MODELS = {
+    'posts': Post,
+    'comments': Comment,
+    'follows': Follow,
+}
+
+
+def parse_since(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'Не удалось разобрать дату: {value}')
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает посты, комментарии или подписки в JSONL или '
+        'CSV. С --output после каждого блока id последней строки и длина '
+        'файла записываются в <output>.cursor, и --resume продолжает с '
+        'них.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=MODELS)
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'), default='jsonl')
+        parser.add_argument(
+            '--gzip', action='store_true', help='Сжимать вывод gzip.')
+        parser.add_argument(
+            '--since',
+            help='Только записи, созданные не раньше этой даты.',
+        )
+        parser.add_argument(
+            '--after', type=int, help='Начать со строки после этого id.')
+        parser.add_argument(
+            '--output', '-o', help='Файл для выгрузки; по умолчанию stdout.')
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Дописать --output с места, сохранённого в курсоре.',
+        )
+
+    def handle(self, *args, **options):
+        model = MODELS[options['model']]
+        queryset = model._default_manager.all()
+        if options['since']:
+            if not any(f.name == 'created' for f in model._meta.fields):
+                raise CommandError(f'У {options["model"]} нет поля created.')
+            queryset = queryset.filter(
+                created__gte=parse_since(options['since']))
+        output, after, offset = options['output'], options['after'], None
+        if options['resume']:
+            if output is None:
+                raise CommandError('--resume работает только с --output.')
+            if os.path.exists(self.cursor_path(output)):
+                after, offset = self.read_cursor(output)
+        export = Export(
+            queryset,
+            format=options['format'],
+            compress=options['gzip'],
+            after=after,
+            header=offset is None,
+        )
+        if output is None:
+            for block in export:
+                sys.stdout.buffer.write(block)
+            sys.stdout.buffer.flush()
+        else:
+            self.write_file(export, output, offset)
+        self.stderr.write(self.style.SUCCESS(
+            f'Выгружено строк: {export.count}, '
+            f'последний id: {export.cursor}'
+        ))
+
+    def cursor_path(self, output):
+        return f'{output}.cursor'
+
+    def read_cursor(self, output):
+        """id последней выгруженной строки и длина файла после её блока."""
+        with open(self.cursor_path(output)) as cursor:
+            after, offset = map(int, cursor.read().split())
+        if offset > os.path.getsize(output):
+            raise CommandError(
+                f'{output} короче, чем записано в курсоре: выгрузите заново.')
+        return after, offset
+
+    def write_file(self, export, output, offset):
+        cursor_path = self.cursor_path(output)
+        with open(output, 'wb' if offset is None else 'r+b') as file:
+            if offset is not None:
+                # Всё после курсора — недописанный блок оборванного запуска.
+                file.truncate(offset)
+                file.seek(offset)
+            for block in export:
+                file.write(block)
+                file.flush()
+                os.fsync(file.fileno())
+                with open(f'{cursor_path}.tmp', 'w') as cursor:
+                    cursor.write(f'{export.cursor} {file.tell()}')
+                os.replace(f'{cursor_path}.tmp', cursor_path)
@@ -0,0 +1,266 @@
+import os
+import random
+import time
+from bisect import bisect
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import reset_queries, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from faker import Faker
+from PIL import Image, ImageDraw
+
+from posts.importer import insert_raw, reset_sequences
+from posts.models import Comment, Follow, Group, Post, User
+
+IMAGE_DIR = 'posts/dataset'
+IMAGE_POOL = 16
+SENTENCE_POOL = 2000
+# Окно дат привязано к фиксированному дню, а не к сегодняшнему: иначе
+# один и тот же --seed давал бы разные created в разные дни.
+DEFAULT_END = '2025-01-01'
+
+
+def parse_end(value):
+    day = parse_date(value)
+    if day is None:
+        raise CommandError(f'Не удалось разобрать дату: {value}')
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+class PowerLaw:
+    """Выбирает id с вероятностью, обратной степени ранга (закон Ципфа)."""
+
+    def __init__(self, rng, ids, alpha):
+        self.rng = rng
+        self.ids = list(ids)
+        rng.shuffle(self.ids)
+        self.cum_weights = list(accumulate(
+            (rank + 1) ** -alpha for rank in range(len(self.ids))))
+
+    def choice(self):
+        point = self.rng.random() * self.cum_weights[-1]
+        return self.ids[bisect(self.cum_weights, point)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу воспроизводимыми данными production-масштаба: '
+        'пользователи, группы, посты с картинками, комментарии и граф '
+        'подписок со степенным распределением популярности авторов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=300000)
+        parser.add_argument('--follows', type=int, default=200000)
+        parser.add_argument(
+            '--image-share', type=float, default=0.1,
+            help='Доля постов с картинкой.')
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help='Показатель степенного закона популярности авторов.')
+        parser.add_argument(
+            '--end', type=parse_end, default=DEFAULT_END,
+            help='Полночь этой даты (ГГГГ-ММ-ДД) — конец окна дат постов.')
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней до --end растянуть посты.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--skip-derived', action='store_true',
+            help='Не пересчитывать счётчики и ленты подписок.')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        self.sentences = [
+            self.fake.sentence(nb_words=10) for _ in range(SENTENCE_POOL)]
+        self.end = options['end']
+        self.start = self.end - timedelta(days=options['days'])
+        started = time.perf_counter()
+        user_ids = self.generate_users()
+        group_ids = self.generate_groups()
+        authors = PowerLaw(self.rng, user_ids, options['alpha'])
+        post_ids = self.generate_posts(authors, group_ids)
+        self.generate_comments(user_ids, post_ids)
+        self.generate_follows(user_ids, authors)
+        if not options['skip_derived']:
+            call_command('reconcile_counters', stdout=self.stdout)
+            call_command('rebuild_timelines', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - started:.0f} с'))
+
+    def insert(self, model, objects):
+        """Пишет объекты пачками batch_size, каждую в своей транзакции."""
+        started, count, batch = time.perf_counter(), 0, []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) == self.options['batch_size']:
+                count += self.save(model, batch)
+                batch = []
+        count += self.save(model, batch)
+        reset_sequences(model)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'  {model._meta.label}: {count} за {elapsed:.1f} с '
+            f'({count / max(elapsed, 1e-9):.0f} в секунду)'
+        )
+
+    def save(self, model, batch):
+        with transaction.atomic():
+            insert_raw(model, batch)
+        reset_queries()
+        return len(batch)
+
+    def text(self, low, high):
+        return ' '.join(self.rng.choices(
+            self.sentences, k=self.rng.randint(low, high)))
+
+    def created(self, position, total):
+        """Время создания растёт вместе с id, как в настоящей базе."""
+        span = (self.end - self.start).total_seconds()
+        return self.start + timedelta(
+            seconds=span * (position + self.rng.random()) / total)
+
+    def generate_users(self):
+        first_id, count = next_id(User), self.options['users']
+        password = make_password('password')
+        self.insert(User, (
+            User(
+                pk=first_id + i,
+                username=f'user{first_id + i}',
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                email=f'user{first_id + i}@example.com',
+                password=password,
+                date_joined=self.created(i, count) - timedelta(days=1),
+            )
+            for i in range(count)
+        ))
+        return range(first_id, first_id + count)
+
+    def generate_groups(self):
+        first_id, count = next_id(Group), self.options['groups']
+        self.insert(Group, (
+            Group(
+                pk=first_id + i,
+                title=self.fake.catch_phrase()[:200],
+                slug=f'group-{first_id + i}',
+                description=self.text(1, 3),
+            )
+            for i in range(count)
+        ))
+        return range(first_id, first_id + count)
+
+    def generate_posts(self, authors, group_ids):
+        first_id, count = next_id(Post), self.options['posts']
+        images = self.image_pool() if self.options['image_share'] else []
+        self.insert(Post, (
+            Post(
+                pk=first_id + i,
+                author_id=authors.choice(),
+                group_id=(
+                    self.rng.choice(group_ids)
+                    if group_ids and self.rng.random() < 0.7 else None
+                ),
+                text=self.text(1, 8),
+                image=(
+                    self.rng.choice(images)
+                    if self.rng.random() < self.options['image_share']
+                    else ''
+                ),
+                created=self.created(i, count),
+            )
+            for i in range(count)
+        ))
+        return range(first_id, first_id + count)
+
+    def generate_comments(self, user_ids, post_ids):
+        if not post_ids:
+            return
+        first_id, count = next_id(Comment), self.options['comments']
+        last = len(post_ids) - 1
+
+        def comment(i):
+            # Свежие посты комментируют чаще старых.
+            index = last - min(int(self.rng.expovariate(5 / len(post_ids))),
+                               last)
+            posted = self.created(index, len(post_ids))
+            return Comment(
+                pk=first_id + i,
+                post_id=post_ids[index],
+                author_id=self.rng.choice(user_ids),
+                text=self.text(1, 2),
+                created=min(
+                    posted + timedelta(hours=self.rng.expovariate(1 / 6)),
+                    self.end,
+                ),
+            )
+        self.insert(Comment, (comment(i) for i in range(count)))
+
+    def generate_follows(self, user_ids, authors):
+        first_id = next_id(Follow)
+        mean = self.options['follows'] / max(len(user_ids), 1)
+        limit = len(user_ids) - 1
+
+        def follows():
+            pk = first_id
+            for user_id in user_ids:
+                degree = min(round(self.rng.expovariate(1 / mean)), limit)
+                chosen = set()
+                # Ограничение попыток: у самых популярных авторов
+                # повторные выборы почти неизбежны.
+                for _ in range(degree * 3):
+                    if len(chosen) == degree:
+                        break
+                    author_id = authors.choice()
+                    if author_id != user_id and author_id not in chosen:
+                        chosen.add(author_id)
+                        yield Follow(pk=pk, user_id=user_id,
+                                     author_id=author_id)
+                        pk += 1
+        if mean:
+            self.insert(Follow, follows())
+
+    def image_pool(self):
+        """Несколько картинок в MEDIA_ROOT, общих для всех постов.
+
+        У каждой картинки свой генератор случайных чисел: уже созданные
+        файлы пропускаются, и общий self.rng от этого не должен зависеть.
+        """
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, IMAGE_DIR),
+                    exist_ok=True)
+        names = []
+        for i in range(IMAGE_POOL):
+            name = f'{IMAGE_DIR}/image_{i}.jpg'
+            path = os.path.join(settings.MEDIA_ROOT, name)
+            if not os.path.exists(path):
+                rng = random.Random(f'{self.options["seed"]}:{i}')
+                color = tuple(rng.randrange(256) for _ in range(3))
+                image = Image.new('RGB', (1600, 1200), color)
+                draw = ImageDraw.Draw(image)
+                for _ in range(20):
+                    box = sorted(rng.sample(range(1600), 2))
+                    draw.ellipse(
+                        (box[0], box[0] * 3 // 4, box[1], box[1] * 3 // 4),
+                        fill=tuple(rng.randrange(256) for _ in range(3)),
+                    )
+                image.save(path, quality=85)
+            names.append(name)
+        return names
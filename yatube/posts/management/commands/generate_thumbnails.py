@@ -0,0 +1,78 @@
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from posts.models import Post
+from posts.thumbnails import (FAILED_KEY, cached_thumbnail,
+                              generate_thumbnail, mark_failed,
+                              prepare_original)
+
+CREATED, SKIPPED, FAILED = 'created', 'skipped', 'failed'
+
+
+def regenerate(name, force):
+    """Создаёт миниатюру картинки; ошибка не прерывает остальные."""
+    try:
+        if force:
+            # Все миниатюры оригинала, включая прежнюю геометрию.
+            default.kvstore.delete_thumbnails(ImageFile(name))
+        elif cached_thumbnail(name) is not None:
+            return SKIPPED
+        prepare_original(name)
+        generate_thumbnail(name)
+    except Exception:
+        mark_failed(name)
+        return FAILED
+    # Показы поста снова могут ставить миниатюру в пул.
+    cache.delete(FAILED_KEY.format(name))
+    return CREATED
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт недостающие миниатюры картинок постов в несколько потоков. '
+        'После смены POST_THUMBNAIL_GEOMETRY создаёт их заново.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Число потоков.',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help=(
+                'Пересоздать и уже существующие миниатюры, удалив '
+                'файлы всех прежних геометрий.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        workers, force = options['workers'], options['force']
+        names = (
+            Post.objects.exclude(image='').order_by()
+            .values_list('image', flat=True).distinct().iterator()
+        )
+        results = Counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                batch = list(islice(names, workers * 8))
+                if not batch:
+                    break
+                results.update(executor.map(
+                    regenerate, batch, [force] * len(batch)))
+        style = self.style.WARNING if results[FAILED] else self.style.SUCCESS
+        self.stdout.write(style(
+            f'Создано миниатюр: {results[CREATED]}, '
+            f'уже были готовы: {results[SKIPPED]}, '
+            f'с ошибками: {results[FAILED]}'
+        ))
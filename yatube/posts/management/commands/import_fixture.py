@@ -0,0 +1,70 @@
+import time
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from posts.importer import IMPORT_ORDER, import_spool, spool_by_model
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает фикстуру в формате dumpdata (data.json, '
+        'dump.json) пачками bulk_create, не читая файл в память целиком.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('fixture', help='Путь к JSON-файлу фикстуры.')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Число строк в одной пачке и транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            with open(options['fixture'], encoding='utf-8') as stream:
+                spools, skipped = spool_by_model(stream)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Не удалось прочитать фикстуру: {error}')
+        self.stdout.write(
+            f'Файл разобран за {time.perf_counter() - started:.1f} с')
+        total = 0
+        for label in IMPORT_ORDER:
+            with spools[label] as spool:
+                total += self.import_model(
+                    label, spool, options['batch_size'])
+        for label, count in sorted(skipped.items()):
+            self.stdout.write(f'  {label}: пропущено {count}')
+        # bulk_create не вызывает сигналы: пересчитываем производные
+        # таблицы и сбрасываем закэшированные ленты.
+        call_command('reconcile_counters', stdout=self.stdout)
+        call_command('rebuild_timelines', stdout=self.stdout)
+        cache.clear()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано объектов: {total} за {elapsed:.1f} с '
+            f'({total / elapsed:.0f} в секунду)'
+        ))
+
+    def import_model(self, label, spool, batch_size):
+        started = time.perf_counter()
+        count = 0
+        try:
+            for size in import_spool(label, spool, batch_size):
+                count += size
+        except (IntegrityError, KeyError, LookupError) as error:
+            raise CommandError(
+                f'{label}: не удалось загрузить пачку после {count} '
+                f'строк: {error!r}'
+            )
+        if count:
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'  {label}: {count} за {elapsed:.2f} с '
+                f'({count / elapsed:.0f} в секунду)'
+            )
+        return count
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Follow, TimelineEntry, User
+from posts.timeline import rebuild_timeline
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок из таблицы подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames',
+            nargs='*',
+            help='Пересобрать ленты только этих пользователей.',
+        )
+
+    def handle(self, *args, **options):
+        if options['usernames']:
+            user_ids = User.objects.filter(
+                username__in=options['usernames'],
+            ).values_list('pk', flat=True)
+        else:
+            user_ids = set(
+                Follow.objects.values_list('user_id', flat=True).distinct()
+            ) | set(
+                TimelineEntry.objects.values_list(
+                    'user_id', flat=True).distinct()
+            )
+        rebuilt = 0
+        for user_id in sorted(user_ids):
+            with transaction.atomic():
+                rebuild_timeline(user_id)
+            rebuilt += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересобрано лент: {rebuilt}')
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import reconcile_post_counters, reconcile_user_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики и исправляет расхождения.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            created, users_fixed = reconcile_user_counters()
+            posts_fixed = reconcile_post_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано счётчиков пользователей: {created}, '
+            f'исправлено пользователей: {users_fixed}, '
+            f'исправлено постов: {posts_fixed}'
+        ))
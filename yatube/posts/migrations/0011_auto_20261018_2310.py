@@ -0,0 +1,73 @@
+# Generated by Django 2.2.28 on 2026-10-18 20:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Значения TIMELINE_MAX_LENGTH и TIMELINE_BATCH_SIZE на момент миграции:
+# она не должна зависеть от настроек и кода приложения, которые
+# изменятся позже.
+TIMELINE_MAX_LENGTH = 1000
+BATCH_SIZE = 500
+
+
+def fill_timelines(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    user_ids = Follow.objects.order_by().values_list('user', flat=True).distinct()
+    for user_id in user_ids.iterator():
+        author_ids = Follow.objects.filter(user_id=user_id).values('author_id')
+        posts = Post.objects.filter(author_id__in=author_ids).order_by(
+            '-created', '-pk'
+        ).values_list('pk', 'author_id', 'created')[:TIMELINE_MAX_LENGTH]
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(
+                    user_id=user_id,
+                    post_id=post_id,
+                    author_id=author_id,
+                    created=created,
+                )
+                for post_id, author_id, created in posts
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0010_auto_20220829_1703'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(verbose_name='Дата создания поста')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.Post', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name_plural': 'Ленты подписок',
+                'ordering': ['-created'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', 'created', 'post'], name='timeline_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', 'author'], name='timeline_user_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='timeline_user_post_unique'),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
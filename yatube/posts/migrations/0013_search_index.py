@@ -0,0 +1,43 @@
+from django.db import migrations
+
+
+def fts_index(table, column):
+    """SQL для индекса FTS5 над column, который триггеры держат в синхроне."""
+    index = f'{table}_fts'
+    create = [
+        f"CREATE VIRTUAL TABLE {index} USING fts5("
+        f"{column}, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61')",
+        f"CREATE TRIGGER {index}_insert AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {index}(rowid, {column}) "
+        f"VALUES (new.id, new.{column}); END",
+        f"CREATE TRIGGER {index}_delete AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {index}({index}, rowid, {column}) "
+        f"VALUES ('delete', old.id, old.{column}); END",
+        f"CREATE TRIGGER {index}_update AFTER UPDATE OF {column} "
+        f"ON {table} BEGIN "
+        f"INSERT INTO {index}({index}, rowid, {column}) "
+        f"VALUES ('delete', old.id, old.{column}); "
+        f"INSERT INTO {index}(rowid, {column}) "
+        f"VALUES (new.id, new.{column}); END",
+        f"INSERT INTO {index}({index}) VALUES ('rebuild')",
+    ]
+    drop = [
+        f'DROP TRIGGER {index}_insert',
+        f'DROP TRIGGER {index}_delete',
+        f'DROP TRIGGER {index}_update',
+        f'DROP TABLE {index}',
+    ]
+    return migrations.RunSQL(create, drop)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_auto_20261018_2311'),
+    ]
+
+    operations = [
+        fts_index('posts_post', 'text'),
+        fts_index('posts_comment', 'text'),
+    ]
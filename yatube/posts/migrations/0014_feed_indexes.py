@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Внешние ключи, чьи одиночные индексы заменяют составные (fk, created).
+FK_FIELDS = [('post', 'author'), ('post', 'group'), ('comment', 'post')]
+
+
+def drop_fk_indexes(apps, schema_editor):
+    """Удаляет индексы внешних ключей через DROP INDEX.
+
+    AlterField в SQLite пересоздаёт таблицу целиком, а вместе с ней
+    пропали бы триггеры полнотекстового индекса из 0013.
+    """
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        for model_name, field_name in FK_FIELDS:
+            model = apps.get_model('posts', model_name)
+            column = model._meta.get_field(field_name).column
+            constraints = connection.introspection.get_constraints(
+                cursor, model._meta.db_table)
+            for name, info in constraints.items():
+                if (info['index'] and not info['unique']
+                        and info['columns'] == [column]):
+                    schema_editor.execute(
+                        f'DROP INDEX {schema_editor.quote_name(name)}')
+
+
+def create_fk_indexes(apps, schema_editor):
+    for model_name, field_name in FK_FIELDS:
+        model = apps.get_model('posts', model_name)
+        field = model._meta.get_field(field_name)
+        schema_editor.execute(schema_editor._create_index_sql(model, [field]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_search_index'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(drop_fk_indexes, create_fk_indexes),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='comment',
+                    name='post',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='posts.Post', verbose_name='Пост'),
+                ),
+                migrations.AlterField(
+                    model_name='post',
+                    name='author',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='posts', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+                ),
+                migrations.AlterField(
+                    model_name='post',
+                    name='group',
+                    field=models.ForeignKey(blank=True, db_index=False, help_text='Группа, к которой будет относиться пост', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='posts', to='posts.Group', verbose_name='Группа'),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'created'], name='post_author_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', 'created'], name='post_group_created_idx'),
+        ),
+    ]
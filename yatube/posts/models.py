@@ -1,4 +1,4 @@
-from core.models import CreatedModel
+from core.models import AtomicSaveModel, CreatedModel
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
@@ -6,6 +6,40 @@ from django.db import models
 User = get_user_model()
 
 
+class PostQuerySet(models.QuerySet):
+    # Поля, которые нужны карточке поста в лентах.
+    FEED_FIELDS = (
+        'text',
+        'created',
+        'image',
+        'comment_count',
+        'author',
+        'author__username',
+        'author__first_name',
+        'author__last_name',
+        'group',
+        'group__slug',
+        'group__title',
+    )
+
+    def for_feed(self):
+        return self.select_related('author', 'group').only(*self.FEED_FIELDS)
+
+    def for_detail(self):
+        return self.select_related('author__counters', 'group')
+
+
+class CommentQuerySet(models.QuerySet):
+    def for_post(self):
+        return self.select_related('author').only(
+            'text',
+            'created',
+            'post_id',
+            'author',
+            'author__username',
+        )
+
+
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
@@ -15,7 +49,7 @@ class Group(models.Model):
         return self.title
 
 
-class Post(CreatedModel):
+class Post(AtomicSaveModel, CreatedModel):
     text = models.TextField(
         'Текст поста',
         help_text='Введите текст поста'
@@ -27,13 +61,15 @@ class Post(CreatedModel):
         on_delete=models.SET_NULL,
         related_name='posts',
         verbose_name='Группа',
-        help_text='Группа, к которой будет относиться пост'
+        help_text='Группа, к которой будет относиться пост',
+        db_index=False,
     )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='posts',
-        verbose_name='Автор'
+        verbose_name='Автор',
+        db_index=False,
     )
     image = models.ImageField(
         'Картинка',
@@ -41,21 +77,56 @@ class Post(CreatedModel):
         blank=True,
         help_text='Загрузите картинку',
     )
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
+
+    # Счётчики меняются только через F()-выражения в posts.counters,
+    # обычное сохранение поста не должно перетирать их старым значением.
+    COUNTER_FIELDS = ('comment_count',)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created']
         verbose_name_plural = 'Посты'
+        # Ленты группы и автора читаются диапазоном по индексу уже в
+        # нужном порядке; индексы внешних ключей покрываются ими же.
+        indexes = [
+            models.Index(
+                fields=['author', 'created'],
+                name='post_author_created_idx'
+            ),
+            models.Index(
+                fields=['group', 'created'],
+                name='post_group_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:settings.POST_TITLE_FROM_TEXT_CUT]
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skipped = set(self.COUNTER_FIELDS) | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in skipped
+                and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
 
-class Comment(CreatedModel):
+
+class Comment(AtomicSaveModel, CreatedModel):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
         related_name='comments',
         verbose_name='Пост',
+        db_index=False,
     )
     author = models.ForeignKey(
         User,
@@ -68,15 +139,23 @@ class Comment(CreatedModel):
         help_text='Введите текст комментария',
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created']
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:settings.POST_TITLE_FROM_TEXT_CUT]
 
 
-class Follow(models.Model):
+class Follow(AtomicSaveModel):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -98,3 +177,70 @@ class Follow(models.Model):
                 name='author_user_unique'
             ),
         ]
+
+
+class UserCounters(models.Model):
+    """Денормализованные счётчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self):
+        return str(self.user)
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок пользователя.
+
+    Заполняется при публикации поста и при подписке, поэтому страница
+    подписок читается одним диапазоном по индексу (user, created).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    created = models.DateTimeField('Дата создания поста')
+
+    class Meta:
+        ordering = ['-created']
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='timeline_user_post_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'created', 'post'],
+                name='timeline_user_created_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author_idx'
+            ),
+        ]
@@ -0,0 +1,267 @@
+import base64
+import hashlib
+import json
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from core.routers import cache_timeout, primary_pinned
+from .cache_versions import (feed_key, feed_version, feeds_modified,
+                             now_and_on_commit)
+from .forms import CommentForm
+from .models import Follow, Group, Post, User
+
+HOLE_MARKER = '<!--hole:{}-->'
+HOLE_RE = re.compile(r'<!--hole:([A-Za-z0-9_=-]+)-->')
+
+hole_renderers = {}
+
+
+def hole(name):
+    """Регистрирует функцию, которая рисует персональный кусок страницы."""
+    def decorator(func):
+        hole_renderers[name] = func
+        return func
+    return decorator
+
+
+def hole_marker(name, *args):
+    payload = json.dumps([name, *args]).encode()
+    return HOLE_MARKER.format(base64.urlsafe_b64encode(payload).decode())
+
+
+def render_hole(request, name, *args):
+    return hole_renderers[name](request, *args)
+
+
+def fill_holes(request, content):
+    def replace(match):
+        name, *args = json.loads(base64.urlsafe_b64decode(match.group(1)))
+        return render_hole(request, name, *args)
+    return HOLE_RE.sub(replace, content)
+
+
+LOOKUP_KEY = 'page-cache-lookup:{}:{}'
+
+
+def cached_lookup(kind, value, queryset, *fields):
+    """Поля объекта по параметру URL; при попадании в кэш без запроса."""
+    key = LOOKUP_KEY.format(kind, value)
+    row = cache.get(key)
+    if row is None:
+        row = queryset.values_list(*fields).first()
+        if row is not None:
+            cache.set(key, row, cache_timeout(settings.PAGE_CACHE_TIMEOUT))
+    return row
+
+
+def forget_lookup(kind, value):
+    now_and_on_commit(cache.delete, LOOKUP_KEY.format(kind, value))
+
+
+def forget_lookups(kind, values, batch_size=1000):
+    keys = [LOOKUP_KEY.format(kind, value) for value in values]
+    for start in range(0, len(keys), batch_size):
+        now_and_on_commit(cache.delete_many, keys[start:start + batch_size])
+
+
+def index_page_feeds(request):
+    return ['index']
+
+
+def group_page_feeds(request, slug):
+    row = cached_lookup('group', slug, Group.objects.filter(slug=slug), 'pk')
+    return row and [feed_key('group', row[0])]
+
+
+def profile_page_feeds(request, username):
+    row = cached_lookup(
+        'user', username, User.objects.filter(username=username), 'pk')
+    return row and [feed_key('author', row[0])]
+
+
+def post_page_feeds(request, post_id):
+    row = cached_lookup(
+        'post', post_id, Post.objects.filter(pk=post_id),
+        'author_id', 'group_id',
+    )
+    if not row:
+        return None
+    author_id, group_id = row
+    feeds = [feed_key('post', post_id), feed_key('author', author_id)]
+    if group_id is not None:
+        feeds.append(feed_key('group', group_id))
+    return feeds
+
+
+FOLLOWING_KEY = 'page-cache-following:{}:{}'
+
+
+def follow_page_feeds(request):
+    """Ленты авторов, на которых подписан пользователь, и его собственная.
+
+    Подписка и отписка меняют версию собственной ленты пользователя,
+    поэтому список авторов кэшируется по ней. Для слишком длинного
+    списка валидатор не считается.
+    """
+    own = feed_key('author', request.user.pk)
+    key = FOLLOWING_KEY.format(request.user.pk, feed_version(own))
+    author_ids = None if primary_pinned() else cache.get(key)
+    if author_ids is None:
+        author_ids = list(Follow.objects.filter(
+            user=request.user,
+        ).values_list('author_id', flat=True)[
+            :settings.CONDITIONAL_MAX_FEEDS + 1])
+        cache.set(
+            key, author_ids, cache_timeout(settings.PAGE_CACHE_TIMEOUT))
+    if len(author_ids) > settings.CONDITIONAL_MAX_FEEDS:
+        return None
+    return [own, *(feed_key('author', author_id) for author_id in author_ids)]
+
+
+def page_versions(request, get_feeds, kwargs):
+    """Ленты страницы и их версии одной строкой, либо None.
+
+    Результат запоминается в запросе, чтобы conditional_page и
+    shared_page_cache не читали версии из кэша дважды.
+    """
+    if not hasattr(request, '_page_versions'):
+        feeds = get_feeds(request, **kwargs)
+        request._page_versions = feeds and (
+            feeds, '.'.join(str(feed_version(feed)) for feed in feeds))
+    return request._page_versions
+
+
+def page_etag(request, versions):
+    # Дырки страницы зависят от пользователя, а форма — от CSRF-cookie.
+    digest = hashlib.md5(repr((
+        request.get_full_path(),
+        versions,
+        request.user.pk,
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME),
+    )).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def conditional_page(get_feeds, personalized=True):
+    """Отвечает 304 на повторный запрос неизменившейся страницы.
+
+    ETag считается по версиям лент из get_feeds, Last-Modified — по
+    времени их последнего изменения, так что проверка не выполняет
+    запросов страницы и ничего не рисует. Дата не различает
+    пользователей и CSRF-cookie, поэтому для персональных страниц
+    Last-Modified не отдаётся и If-Modified-Since не учитывается:
+    их проверяет только ETag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            state = page_versions(request, get_feeds, kwargs)
+            if not state:
+                return view(request, *args, **kwargs)
+            feeds, versions = state
+            etag = page_etag(request, versions)
+            last_modified = None if personalized else feeds_modified(feeds)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                if last_modified is not None:
+                    response['Last-Modified'] = http_date(last_modified)
+                patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def shared_page_cache(get_feeds):
+    """Кэширует страницу целиком, одну копию на URL для всех пользователей.
+
+    get_feeds(request, **kwargs) возвращает ленты, от версий которых
+    зависит страница, или None, если кэшировать не нужно. Персональные
+    части страницы рисуются тегом {% hole %} и подставляются заново на
+    каждый запрос.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+            state = page_versions(request, get_feeds, kwargs)
+            if not state:
+                return view(request, *args, **kwargs)
+            versions = state[1]
+            path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            key = f'page:{path}:{versions}'
+            cached = None if primary_pinned() else cache.get(key)
+            if cached is None:
+                request._page_cache = True
+                response = view(request, *args, **kwargs)
+                request._page_cache = False
+                if response.status_code != 200 or response.streaming:
+                    return response
+                cached = (response.content.decode(response.charset),
+                          response['Content-Type'])
+                cache.set(
+                    key, cached, cache_timeout(settings.PAGE_CACHE_TIMEOUT))
+            content, content_type = cached
+            return HttpResponse(
+                fill_holes(request, content),
+                content_type=content_type,
+            )
+        return wrapper
+    return decorator
+
+
+@hole('header')
+def header_hole(request):
+    return render_to_string('includes/header.html', request=request)
+
+
+@hole('switcher')
+def switcher_hole(request):
+    return render_to_string(
+        'posts/includes/switcher.html', request=request)
+
+
+@hole('follow_button')
+def follow_button_hole(request, author_id, author_username):
+    if request.user.pk == author_id:
+        return ''
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user,
+        author_id=author_id,
+    ).exists()
+    return render_to_string('posts/includes/follow_button.html', {
+        'author_username': author_username,
+        'following': following,
+    }, request=request)
+
+
+@hole('edit_button')
+def edit_button_hole(request, post_id, author_id):
+    if request.user.pk != author_id:
+        return ''
+    return render_to_string('posts/includes/edit_button.html', {
+        'post_id': post_id,
+    }, request=request)
+
+
+@hole('comment_form')
+def comment_form_hole(request, post_id):
+    if not request.user.is_authenticated:
+        return ''
+    return render_to_string('posts/includes/comment_form.html', {
+        'post_id': post_id,
+        'form': CommentForm(),
+    }, request=request)
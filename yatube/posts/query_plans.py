@@ -0,0 +1,95 @@
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Follow, Group, Post
+
+TEMP_SORT = 'USE TEMP B-TREE'
+# Поиск сортирует по релевантности, посчитанной в запросе: индекса для
+# такого порядка быть не может.
+SEARCH_SORTS = {
+    'USE TEMP B-TREE FOR GROUP BY',
+    'USE TEMP B-TREE FOR ORDER BY',
+}
+
+
+def explain(sql):
+    """Строки плана EXPLAIN QUERY PLAN для уже подставленного SQL."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def plan_problems(sql, plan, tables):
+    """Сортировки во временном B-дереве и полные проходы по таблицам.
+
+    Полный проход считается проблемой, только если в запросе есть WHERE:
+    выборку всей таблицы индекс не ускорит. SCAN по индексу (USING) и
+    проход по подзапросам и виртуальным таблицам FTS пропускаются.
+    """
+    filtered = ' WHERE ' in sql.upper()
+    for detail in plan:
+        if TEMP_SORT in detail:
+            yield detail
+        elif (filtered and detail.startswith('SCAN ')
+              and ' USING ' not in detail
+              and 'VIRTUAL TABLE' not in detail
+              and detail.split()[1] in tables):
+            yield detail
+
+
+def view_urls():
+    """Страницы, запросы которых проверяем, на данных из базы.
+
+    Возвращает (url, пользователь или None, ожидаемые строки плана);
+    страницы без данных для них пропускаются.
+    """
+    post = Post.objects.order_by('-comment_count', '-pk').first()
+    if post is None:
+        return []
+    author = post.author
+    urls = [
+        (reverse('posts:index'), None, set()),
+        (reverse('posts:profile', args=[author.username]), None, set()),
+        (reverse('posts:post_detail', args=[post.pk]), author, set()),
+        (reverse('posts:post_edit', args=[post.pk]), author, set()),
+        (reverse('posts:post_create'), author, set()),
+        (f'{reverse("posts:search")}?q={post.text.split()[0]}', None,
+         SEARCH_SORTS),
+    ]
+    group = Group.objects.filter(posts__isnull=False).first()
+    if group is not None:
+        urls.append(
+            (reverse('posts:group_list', args=[group.slug]), None, set()))
+    follow = Follow.objects.select_related('user').first()
+    if follow is not None:
+        urls.append((reverse('posts:follow_index'), follow.user, set()))
+    return urls
+
+
+def collect_problems(urls):
+    """Проходит по страницам и собирает проблемные планы SELECT.
+
+    Возвращает список (url, sql, строки плана с проблемами). Кэш стоит
+    отключить, иначе часть запросов не выполнится.
+    """
+    tables = set(connection.introspection.table_names())
+    problems = []
+    for url, user, expected in urls:
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        with CaptureQueriesContext(connection) as context:
+            client.get(url)
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            flagged = [
+                detail for detail in plan_problems(sql, explain(sql), tables)
+                if detail not in expected
+            ]
+            if flagged:
+                problems.append((url, sql, flagged))
+    return problems
@@ -0,0 +1,112 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+from .utils import CURSOR_NEXT, CursorPaginator, decode_cursor
+
+WORD = re.compile(r'\w+')
+
+# Пост попадает в выдачу своим текстом или текстом комментариев; у
+# совпадений в комментариях вес меньше. bm25 отрицателен: чем меньше
+# значение, тем выше пост в выдаче.
+MATCHES_SQL = '''
+    SELECT post_id, MIN(weight) AS score FROM (
+        SELECT rowid AS post_id, bm25(posts_post_fts) AS weight
+        FROM posts_post_fts
+        WHERE posts_post_fts MATCH %s
+        UNION ALL
+        SELECT comment.post_id, bm25(posts_comment_fts) * %s
+        FROM posts_comment_fts
+        JOIN posts_comment AS comment
+            ON comment.id = posts_comment_fts.rowid
+        WHERE posts_comment_fts MATCH %s
+    )
+    GROUP BY post_id
+'''
+
+
+def match_expression(query):
+    """Превращает ввод пользователя в безопасный запрос FTS5.
+
+    Каждое слово ищется по префиксу (так находятся и другие словоформы),
+    все слова должны встретиться в тексте.
+    """
+    words = WORD.findall(query)[:settings.SEARCH_MAX_TERMS]
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def matching_ids(index, query):
+    """Подзапрос с id строк, подходящих под query, для filter(pk__in=...)."""
+    return RawSQL(
+        f'SELECT rowid FROM {index} WHERE {index} MATCH %s',
+        (match_expression(query),),
+    )
+
+
+class SearchPaginator(CursorPaginator):
+    """Курсорный паджинатор по результатам полнотекстового поиска.
+
+    Вместо (created, id) ключом служит пара (релевантность, id поста),
+    так что следующая страница выбирается условием HAVING, а не OFFSET.
+    """
+
+    def __init__(self, query, per_page):
+        super().__init__(
+            Post.objects.for_feed(), per_page, created_field='search_rank')
+        self.match = match_expression(query)
+
+    def format_value(self, value):
+        return repr(value)
+
+    def parse_value(self, raw):
+        return float(raw)
+
+    def get_cursor_page(self, token):
+        if not self.match:
+            return self._build_page([], 1, False)
+        cursor = decode_cursor(token, self.parse_value) if token else None
+        if cursor is None:
+            rows = self._ranked('', (), 'score, post_id')
+            return self._build_page(rows, 1, len(rows) > self.per_page)
+        direction, number, score, key = cursor
+        if direction == CURSOR_NEXT:
+            rows = self._ranked(
+                'HAVING score > %s OR (score = %s AND post_id > %s)',
+                (score, score, key),
+                'score, post_id',
+            )
+            return self._build_page(
+                rows, max(number, 2), len(rows) > self.per_page)
+        rows = self._ranked(
+            'HAVING score < %s OR (score = %s AND post_id < %s)',
+            (score, score, key),
+            'score DESC, post_id DESC',
+        )
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return self._build_page(
+            rows, max(number, 2) if has_previous else 1, True)
+
+    def _ranked(self, having, params, order):
+        sql = f'{MATCHES_SQL} {having} ORDER BY {order} LIMIT %s'
+        with connection.cursor() as cursor:
+            cursor.execute(sql, (
+                self.match,
+                settings.SEARCH_COMMENT_WEIGHT,
+                self.match,
+                *params,
+                self.per_page + 1,
+            ))
+            ranked = cursor.fetchall()
+        posts = self.object_list.in_bulk([post_id for post_id, _ in ranked])
+        rows = []
+        for post_id, score in ranked:
+            post = posts.get(post_id)
+            if post is not None:
+                post.search_rank = score
+                rows.append(post)
+        return rows
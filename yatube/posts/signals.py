@@ -0,0 +1,127 @@
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from .cache_versions import bump_feed_versions, feed_key, post_feeds
+from .counters import change_comment_count, change_user_counters
+from .models import Comment, Follow, Group, Post, User, UserCounters
+from .page_cache import forget_lookup
+from .timeline import backfill_timeline, fan_out_post, prune_timeline
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, update_fields=None,
+               **kwargs):
+    if created and not raw:
+        UserCounters.objects.get_or_create(user=instance)
+        return
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    # Имя автора выводится в карточках всех лент, где есть его посты.
+    group_ids = Post.objects.filter(author_id=instance.pk).order_by(
+    ).values_list('group_id', flat=True).distinct()
+    bump_feed_versions(*post_feeds(instance.pk, *group_ids))
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, raw=False, **kwargs):
+    # Запоминаем прежнюю группу, чтобы сбросить кэш и её ленты.
+    instance._previous_group_id = None
+    if not instance._state.adding and not raw:
+        instance._previous_group_id = Post.objects.filter(
+            pk=instance.pk,
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    bump_feed_versions(feed_key('post', instance.pk), *post_feeds(
+        instance.author_id,
+        instance.group_id,
+        getattr(instance, '_previous_group_id', None),
+    ))
+    forget_lookup('post', instance.pk)
+    if created and not raw:
+        change_user_counters(instance.author_id, posts_count=1)
+        fan_out_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    bump_feed_versions(
+        feed_key('post', instance.pk),
+        *post_feeds(instance.author_id, instance.group_id),
+    )
+    forget_lookup('post', instance.pk)
+    change_user_counters(instance.author_id, posts_count=-1)
+
+
+def bump_comment_feeds(comment):
+    # Карточки в лентах показывают число комментариев.
+    post = Post.objects.filter(pk=comment.post_id).values_list(
+        'author_id', 'group_id',
+    ).first()
+    if post is not None:
+        bump_feed_versions(
+            feed_key('post', comment.post_id),
+            *post_feeds(*post),
+        )
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_comment_count(instance.post_id, 1)
+        bump_comment_feeds(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    change_comment_count(instance.post_id, -1)
+    bump_comment_feeds(instance)
+
+
+def bump_group_feeds(group):
+    # Ссылки на группу есть и в карточках профилей её авторов.
+    author_ids = Post.objects.filter(group_id=group.pk).order_by().values_list(
+        'author_id', flat=True,
+    ).distinct()
+    bump_feed_versions(
+        feed_key('group', group.pk),
+        *(feed_key('author', author_id) for author_id in author_ids),
+    )
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, **kwargs):
+    bump_group_feeds(instance)
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    bump_group_feeds(instance)
+
+
+def bump_follow_feeds(follow):
+    # Профили обоих пользователей показывают счётчики подписок.
+    bump_feed_versions(
+        feed_key('author', follow.author_id),
+        feed_key('author', follow.user_id),
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_user_counters(instance.author_id, followers_count=1)
+        change_user_counters(instance.user_id, following_count=1)
+        bump_follow_feeds(instance)
+        backfill_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    change_user_counters(instance.author_id, followers_count=-1)
+    change_user_counters(instance.user_id, following_count=-1)
+    bump_follow_feeds(instance)
+    prune_timeline(instance.user_id, instance.author_id)
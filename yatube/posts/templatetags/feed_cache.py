@@ -0,0 +1,48 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+from core.routers import cache_timeout, primary_pinned
+from ..cache_versions import feed_key, feed_version
+
+register = template.Library()
+
+
+class FeedCacheNode(template.Node):
+    def __init__(self, nodelist, parts):
+        self.nodelist = nodelist
+        self.parts = parts
+
+    def render(self, context):
+        feed = feed_key(*(part.resolve(context) for part in self.parts))
+        request = context['request']
+        key = make_template_fragment_key('feed', [
+            feed,
+            feed_version(feed),
+            request.GET.get('page', ''),
+            request.GET.get('cursor', ''),
+        ])
+        value = None if primary_pinned() else cache.get(key)
+        if value is None:
+            value = self.nodelist.render(context)
+            cache.set(
+                key, value, cache_timeout(settings.FEED_CACHE_TIMEOUT))
+        return value
+
+
+@register.tag
+def feedcache(parser, token):
+    """Кэширует фрагмент ленты с учётом страницы и версии ленты.
+
+    {% feedcache 'group' group.pk %} ... {% endfeedcache %}
+    """
+    parts = token.split_contents()[1:]
+    if not parts:
+        raise template.TemplateSyntaxError(
+            "'feedcache' tag requires at least one argument."
+        )
+    nodelist = parser.parse(('endfeedcache',))
+    parser.delete_first_token()
+    return FeedCacheNode(
+        nodelist, [parser.compile_filter(part) for part in parts])
@@ -0,0 +1,19 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..page_cache import hole_marker, render_hole
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, *args):
+    """Персональный кусок страницы: {% hole 'follow_button' author.pk %}.
+
+    Внутри shared_page_cache выводит метку, которую декоратор заменит
+    для каждого пользователя, иначе рисуется сразу.
+    """
+    request = context['request']
+    if getattr(request, '_page_cache', False):
+        return mark_safe(hole_marker(name, *args))
+    return mark_safe(render_hole(request, name, *args))
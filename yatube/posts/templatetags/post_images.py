@@ -0,0 +1,28 @@
+from django import template
+
+from ..thumbnails import (cached_thumbnail, prefetch_thumbnails,
+                          schedule_thumbnail)
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post):
+    """Готовая миниатюра картинки поста или None.
+
+    Если миниатюры ещё нет, её создание ставится в фоновый пул, а шаблон
+    показывает исходную картинку.
+    """
+    if not post.image:
+        return None
+    thumbnail = cached_thumbnail(post.image.name)
+    if thumbnail is None:
+        schedule_thumbnail(post)
+    return thumbnail
+
+
+@register.simple_tag
+def prefetch_post_thumbnails(posts):
+    """Перед циклом по ленте: {% prefetch_post_thumbnails page_obj %}."""
+    prefetch_thumbnails(posts)
+    return ''
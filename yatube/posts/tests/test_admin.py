@@ -0,0 +1,82 @@
+from django.contrib.admin import ACTION_CHECKBOX_NAME
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..cache_versions import feed_key, feed_version
+from ..models import Comment, Group, Post, User
+
+
+class AdminPerformanceTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        Group.objects.bulk_create(
+            Group(title=f'Группа {i}', slug=f'group-{i}') for i in range(3))
+        cls.groups = list(Group.objects.order_by('slug'))
+        Post.objects.bulk_create(
+            Post(author=cls.admin, text=f'Пост {i}', group=cls.groups[0])
+            for i in range(30)
+        )
+        Comment.objects.bulk_create(
+            Comment(author=cls.admin, post=post, text='Комментарий')
+            for post in Post.objects.all()
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def changelist_queries(self, name):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow(self):
+        names = ('admin:posts_post_changelist',
+                 'admin:posts_comment_changelist')
+        before = [self.changelist_queries(name) for name in names]
+        post = Post.objects.create(author=self.admin, text='Ещё пост')
+        Comment.objects.bulk_create(
+            Comment(author=self.admin, post=post, text='Комментарий')
+            for _ in range(30)
+        )
+        Post.objects.bulk_create(
+            Post(author=self.admin, text='Пост', group=self.groups[2])
+            for _ in range(30)
+        )
+        after = [self.changelist_queries(name) for name in names]
+        self.assertEqual(before, after)
+
+    def test_no_group_select_per_row(self):
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        # Список групп рисуется только в форме действия.
+        self.assertContains(response, 'Группа 2</option>', count=1)
+
+    def test_move_to_group_action(self):
+        group = self.groups[1]
+        version = feed_version(feed_key('group', group.pk))
+        response = self.client.post(
+            reverse('admin:posts_post_changelist'),
+            {
+                'action': 'move_to_group',
+                'group': group.pk,
+                'select_across': 1,
+                'index': 0,
+                ACTION_CHECKBOX_NAME: [Post.objects.first().pk],
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Post.objects.filter(group=group).count(), 30)
+        self.assertNotEqual(
+            feed_version(feed_key('group', group.pk)), version)
+
+    def test_post_autocomplete_uses_search_index(self):
+        response = self.client.get(
+            reverse('admin:posts_post_autocomplete'), {'term': 'Пост 7'})
+        self.assertEqual(
+            [result['text'] for result in response.json()['results']],
+            ['Пост 7'],
+        )
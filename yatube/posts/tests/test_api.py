@@ -0,0 +1,142 @@
+import gzip
+import json
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class APITest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author,
+                text=f'Тестовый пост {index}',
+                group=cls.group,
+            )
+            for index in range(5)
+        ]
+        cls.post = cls.posts[-1]
+        for index in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Комментарий {index}')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def get_json(self, url, client=None, **params):
+        response = (client or self.client).get(url, params)
+        return response.status_code, json.loads(response.content)
+
+    def test_feeds_follow_cursor(self):
+        urls = [
+            reverse('posts:api_posts'),
+            reverse('posts:api_group_posts', args=[self.group.slug]),
+            reverse('posts:api_profile_posts', args=[self.author.username]),
+        ]
+        expected = [post.pk for post in reversed(self.posts)]
+        for url in urls:
+            for client in (self.client, self.reader_client):
+                with self.subTest(url=url):
+                    ids, cursor = [], None
+                    while True:
+                        params = {'limit': 2, 'fields': 'id'}
+                        if cursor:
+                            params['cursor'] = cursor
+                        status, data = self.get_json(url, client, **params)
+                        self.assertEqual(status, 200)
+                        ids += [row['id'] for row in data['results']]
+                        cursor = data['next']
+                        if cursor is None:
+                            break
+                    self.assertEqual(ids, expected)
+        status, data = self.get_json(
+            reverse('posts:api_follow'), self.reader_client, limit=2)
+        self.assertEqual(
+            [row['id'] for row in data['results']], expected[:2])
+        self.assertEqual(data['results'][0]['author'], 'author')
+
+    def test_fields_projection(self):
+        status, data = self.get_json(
+            reverse('posts:api_post', args=[self.post.pk]),
+            fields='text,author')
+        self.assertEqual(status, 200)
+        self.assertEqual(data, {'text': self.post.text, 'author': 'author'})
+        status, data = self.get_json(
+            reverse('posts:api_posts'), fields='group', limit=1)
+        self.assertEqual(data['results'], [{'group': 'test-slug'}])
+        status, data = self.get_json(
+            reverse('posts:api_posts'), fields='text,password')
+        self.assertEqual(status, 400)
+        self.assertIn('password', data['error'])
+
+    def test_batch_keeps_requested_order(self):
+        ids = [self.posts[1].pk, 0, self.posts[3].pk, self.posts[1].pk]
+        status, data = self.get_json(
+            reverse('posts:api_posts'),
+            ids=','.join(map(str, ids)), fields='text')
+        self.assertEqual(status, 200)
+        self.assertEqual(data['results'], [
+            {'text': self.posts[1].text}, {'text': self.posts[3].text}])
+        status, _ = self.get_json(reverse('posts:api_posts'), ids='1,x')
+        self.assertEqual(status, 400)
+
+    def test_comments(self):
+        status, data = self.get_json(
+            reverse('posts:api_post_comments', args=[self.post.pk]),
+            fields='text')
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            [row['text'] for row in data['results']],
+            ['Комментарий 2', 'Комментарий 1', 'Комментарий 0'])
+
+    def test_errors(self):
+        missing = self.post.pk + 100
+        for url in (
+            reverse('posts:api_post', args=[missing]),
+            reverse('posts:api_post_comments', args=[missing]),
+            reverse('posts:api_group_posts', args=['missing']),
+            reverse('posts:api_profile_posts', args=['missing']),
+        ):
+            with self.subTest(url=url):
+                status, _ = self.get_json(url)
+                self.assertEqual(status, 404)
+        status, _ = self.get_json(reverse('posts:api_follow'))
+        self.assertEqual(status, 401)
+        status, _ = self.get_json(reverse('posts:api_posts'), cursor='bad')
+        self.assertEqual(status, 400)
+        response = self.client.post(reverse('posts:api_posts'))
+        self.assertEqual(response.status_code, 405)
+
+    def test_gzip_and_conditional_get(self):
+        url = reverse('posts:api_posts')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(data['results']), len(self.posts))
+        response = self.client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 304)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_api', requests=1, stdout=out)
+        output = out.getvalue()
+        for name in ('index', 'group', 'profile', 'post', 'follow'):
+            self.assertIn(name, output)
@@ -0,0 +1,62 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post, User, UserCounters
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def counters(self, user):
+        return UserCounters.objects.get(user=user)
+
+    def test_post_counters_follow_create_and_delete(self):
+        post = Post.objects.create(author=self.author, text='Ещё пост')
+        self.assertEqual(self.counters(self.author).posts_count, 2)
+        post.delete()
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+
+    def test_comment_count_survives_post_edit(self):
+        stale_post = Post.objects.get(pk=self.post.pk)
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий')
+        stale_post.text = 'Отредактированный пост'
+        stale_post.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_follow_counters(self):
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.counters(self.author).followers_count, 1)
+        self.assertEqual(self.counters(self.reader).following_count, 1)
+        follow.delete()
+        self.assertEqual(self.counters(self.author).followers_count, 0)
+        self.assertEqual(self.counters(self.reader).following_count, 0)
+
+    def test_reconcile_command_repairs_drift(self):
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий')
+        UserCounters.objects.filter(user=self.author).update(posts_count=7)
+        UserCounters.objects.filter(user=self.reader).delete()
+        Post.objects.filter(pk=self.post.pk).update(comment_count=5)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        self.assertEqual(self.counters(self.reader).posts_count, 0)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_profile_reads_stored_counters(self):
+        UserCounters.objects.filter(user=self.author).update(posts_count=42)
+        response = self.client.get(
+            reverse('posts:profile', args=[self.author.username]))
+        self.assertContains(response, 'Всего постов: 42')
@@ -0,0 +1,72 @@
+import shutil
+import tempfile
+from collections import Counter
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import Comment, Follow, Group, Post, User, UserCounters
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GenerateDatasetTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def generate(self, *args):
+        call_command(
+            'generate_dataset',
+            '--users=50', '--groups=3', '--posts=200', '--comments=300',
+            '--follows=400', '--image-share=0.5', '--batch-size=64',
+            *args, stdout=StringIO(),
+        )
+        return (
+            list(Post.objects.order_by('pk').values_list(
+                'author_id', 'group_id', 'text', 'image', 'created')),
+            list(Follow.objects.order_by('pk').values_list(
+                'user_id', 'author_id')),
+        )
+
+    def test_generates_requested_shape(self):
+        posts, follows = self.generate()
+        self.assertEqual(User.objects.count(), 50)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertEqual(UserCounters.objects.count(), 50)
+        with_image = sum(1 for post in posts if post[3])
+        self.assertTrue(50 < with_image < 150)
+        # Подписчики сосредоточены у немногих популярных авторов.
+        followers = sorted(Counter(a for _, a in follows).values())
+        self.assertGreater(followers[-1], 5 * followers[len(followers) // 2])
+
+    def test_same_seed_gives_same_data(self):
+        # Первый запуск создаёт картинки, второй застаёт их готовыми.
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        first = self.generate()
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        # Повторный запуск в другой день даёт те же даты.
+        later = timezone.now() + timedelta(days=3)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            second = self.generate('--end=2025-01-01')
+        self.assertEqual(first, second)
+
+    def test_end_sets_date_window(self):
+        posts, _ = self.generate('--end=2020-06-01', '--days=10')
+        created = [post[4] for post in posts]
+        self.assertLessEqual(
+            max(created), timezone.make_aware(datetime(2020, 6, 1)))
+        self.assertGreaterEqual(
+            min(created), timezone.make_aware(datetime(2020, 5, 22)))
@@ -0,0 +1,72 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.admin import ACTION_CHECKBOX_NAME
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post, User
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(EXPORT_CHUNK_SIZE=3, EXPORT_BLOCK_SIZE=1)
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_superuser(
+            username='author', email='author@example.com', password='pass')
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Пост {i}') for i in range(7))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def export(self, path, *args):
+        call_command(
+            'export_data', 'posts', '--gzip', f'--output={path}', *args,
+            stderr=StringIO(),
+        )
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            return [json.loads(line)['text'] for line in file]
+
+    def test_resume_appends_new_rows(self):
+        path = os.path.join(TEMP_DIR, 'posts.jsonl.gz')
+        self.assertEqual(
+            self.export(path), [f'Пост {i}' for i in range(7)])
+        with open(f'{path}.cursor') as cursor:
+            after, offset = map(int, cursor.read().split())
+        self.assertEqual(after, Post.objects.order_by('pk').last().pk)
+        self.assertEqual(offset, os.path.getsize(path))
+        # Оборванный запуск оставил в конце половину gzip-члена.
+        with open(path, 'ab') as file:
+            file.write(gzip.compress('{"text": "Обрыв'.encode())[:20])
+        Post.objects.create(author=self.author, text='Новый пост')
+        texts = self.export(path, '--resume')
+        self.assertEqual(texts[-2:], ['Пост 6', 'Новый пост'])
+        self.assertEqual(len(texts), 8)
+
+    def test_admin_action_streams_csv(self):
+        self.client.force_login(self.author)
+        response = self.client.post(
+            reverse('admin:posts_post_changelist'),
+            {
+                'action': 'export_csv',
+                'select_across': 1,
+                'index': 0,
+                ACTION_CHECKBOX_NAME: [Post.objects.first().pk],
+            },
+        )
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,created,author_id,group_id,text,image')
+        self.assertEqual(len(lines), 8)
@@ -108,3 +108,23 @@ class PostCreateFormTest(TestCase):
                 post=self.post,
             ).exists()
         )
+
+    @override_settings(UPLOAD_MAX_SIZE=16)
+    def test_too_large_image_rejected(self):
+        post_count = Post.objects.count()
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Слишком большой файл', 'image': self.uploaded},
+        )
+        self.assertEqual(Post.objects.count(), post_count)
+        self.assertFormError(
+            response, 'form', 'image', 'Файл больше 0 МБ.')
+
+    @override_settings(POST_IMAGE_FORMATS=('JPEG',))
+    def test_image_format_checked(self):
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Картинка GIF', 'image': self.uploaded},
+        )
+        self.assertFormError(
+            response, 'form', 'image', 'Поддерживаются форматы: JPEG.')
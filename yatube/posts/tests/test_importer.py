@@ -0,0 +1,41 @@
+import json
+import os
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..importer import iter_json_array
+from ..models import Comment, Follow, Group, Post, User, UserCounters
+
+
+class ImportFixtureTest(TestCase):
+    def test_iter_json_array_reads_in_small_chunks(self):
+        items = [{'text': 'Пост, с [скобками] и "кавычками"'}, 1, [2, 3]]
+        stream = StringIO(' \n' + json.dumps(items, indent=2))
+        self.assertEqual(list(iter_json_array(stream, chunk_size=3)), items)
+
+    def test_import_repository_fixture(self):
+        path = os.path.join(settings.BASE_DIR, 'data.json')
+        out = StringIO()
+        call_command('import_fixture', path, '--batch-size=7', stdout=out)
+        self.assertEqual(Group.objects.count(), 2)
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Post.objects.count(), 54)
+        self.assertEqual(Comment.objects.count(), 4)
+        self.assertEqual(Follow.objects.count(), 1)
+        # Даты берутся из фикстуры, а не из auto_now_add.
+        self.assertEqual(
+            Post.objects.get(pk=2).created.isoformat(),
+            '2022-08-24T11:27:09.228000+00:00',
+        )
+        leo = User.objects.get(username='leo')
+        self.assertEqual(
+            UserCounters.objects.get(user=leo).posts_count,
+            leo.posts.count(),
+        )
+        self.assertIn('admin.logentry: пропущено 35', out.getvalue())
+        # Повторная загрузка не создаёт дублей.
+        call_command('import_fixture', path, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 54)
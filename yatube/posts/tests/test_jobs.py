@@ -0,0 +1,164 @@
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.cron import Cron
+from core.jobs import (Heartbeat, Scheduler, claim, enqueue, execute, renew,
+                       task)
+from core.models import Job
+from ..models import User
+
+calls = []
+
+
+@task('tests.record')
+def record(*args):
+    calls.append(args)
+
+
+@task('tests.broken', max_attempts=2)
+def broken():
+    raise RuntimeError('сломано')
+
+
+class CronTest(TestCase):
+    def test_next_after(self):
+        moment = datetime(2024, 1, 31, 23, 59, 30)
+        cases = {
+            '* * * * *': datetime(2024, 2, 1, 0, 0),
+            '*/15 * * * *': datetime(2024, 2, 1, 0, 0),
+            '30 3 * * *': datetime(2024, 2, 1, 3, 30),
+            '0 4 * * 0': datetime(2024, 2, 4, 4, 0),
+            '0 4 * * 7': datetime(2024, 2, 4, 4, 0),
+            '0 0 29 2 *': datetime(2024, 2, 29, 0, 0),
+            '0 12 1-7 * 1': datetime(2024, 2, 1, 12, 0),
+            '0 9-17/4 * 3,6 *': datetime(2024, 3, 1, 9, 0),
+        }
+        for expression, expected in cases.items():
+            with self.subTest(expression=expression):
+                self.assertEqual(Cron(expression).next_after(moment), expected)
+
+    def test_invalid(self):
+        for expression in ('* * * *', '60 * * * *', '5-1 * * * *',
+                           '0 0 30 2 *'):
+            with self.subTest(expression=expression):
+                with self.assertRaises(ValueError):
+                    Cron(expression).next_after(datetime(2024, 1, 1))
+
+
+@override_settings(JOBS_PERIODIC={})
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+        cache.clear()
+
+    def run_worker(self):
+        call_command('run_jobs', once=True, workers=0, stdout=StringIO())
+
+    def test_enqueue_and_run(self):
+        enqueue(record, 1, 'два')
+        enqueue('tests.record', [3])
+        self.run_worker()
+        self.assertEqual(calls, [(1, 'два'), ([3],)])
+        self.assertEqual(
+            Job.objects.filter(status=Job.DONE, attempts=1).count(), 2)
+
+    def test_enqueue_follows_transaction(self):
+        with transaction.atomic():
+            enqueue(record, 1)
+            transaction.set_rollback(True)
+        self.assertFalse(Job.objects.exists())
+
+    def test_idempotency_key(self):
+        job = enqueue(record, 1, key='once')
+        self.assertEqual(enqueue(record, 2, key='once'), job)
+        self.run_worker()
+        self.assertEqual(calls, [(1,)])
+
+    def test_delayed_job_waits(self):
+        enqueue(record, 1, run_at=timezone.now() + timedelta(minutes=1))
+        self.run_worker()
+        self.assertEqual(calls, [])
+
+    @override_settings(JOBS_BACKOFF=30)
+    def test_retries_with_backoff(self):
+        job = enqueue(broken)
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('сломано', job.last_error)
+        self.assertGreater(
+            job.run_at, timezone.now() + timedelta(seconds=25))
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_claim_is_exclusive_and_recovers_stale(self):
+        job = enqueue(record, 1)
+        self.assertEqual(claim('first', 5), [job.pk])
+        self.assertEqual(claim('second', 5), [])
+        Job.objects.update(locked_until=timezone.now() - timedelta(1))
+        self.assertEqual(claim('second', 5), [job.pk])
+        execute(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), (Job.DONE, 'second'))
+
+    def test_renew_keeps_long_job_locked(self):
+        job = enqueue(record, 1)
+        claim('first', 5)
+        later = timezone.now() + timedelta(seconds=60)
+        with mock.patch('core.jobs.timezone.now', return_value=later):
+            self.assertEqual(renew('second', [job.pk]), 0)
+            self.assertEqual(renew('first', [job.pk]), 1)
+        stale = later + timedelta(seconds=settings.JOBS_LOCK_TIMEOUT - 1)
+        with mock.patch('core.jobs.timezone.now', return_value=stale):
+            self.assertEqual(claim('second', 5), [])
+
+    def test_scheduler_enqueues_each_run_once(self):
+        periodic = {'every': {'cron': '*/10 * * * *', 'task': 'tests.record',
+                              'args': [7]}}
+        now = timezone.now()
+        Scheduler(periodic).tick(now)
+        Scheduler(periodic).tick(now)
+        job = Job.objects.get()
+        self.assertTrue(job.key.startswith('periodic:every:'))
+        self.assertGreater(job.run_at, now)
+        self.assertEqual(job.run_at.minute % 10, 0)
+        with mock.patch('core.jobs.timezone.now', return_value=job.run_at):
+            self.run_worker()
+        self.assertEqual(calls, [(7,)])
+
+    def reset_password(self):
+        User.objects.create_user(
+            username='user', email='user@example.com', password='pass')
+        response = self.client.post(
+            reverse('users:password_reset'), {'email': 'user@example.com'})
+        self.assertRedirects(response, reverse('users:password_reset_done'))
+
+    def test_password_reset_mail_is_queued(self):
+        Heartbeat('worker').beat()
+        self.reset_password()
+        self.assertEqual(len(mail.outbox), 0)
+        self.run_worker()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['user@example.com'])
+
+    def test_password_reset_mail_is_sent_without_worker(self):
+        self.reset_password()
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['user@example.com'])
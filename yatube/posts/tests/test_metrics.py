@@ -0,0 +1,110 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from ..models import Post, User
+
+TEMP_METRICS_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def finished_process_pid():
+    process = subprocess.Popen(['true'])
+    process.wait()
+    return process.pid
+
+
+@override_settings(METRICS_DIR=TEMP_METRICS_DIR, METRICS_TOKEN='secret')
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        Post.objects.create(author=cls.author, text='Тестовый пост')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_METRICS_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.clear()
+        shutil.rmtree(TEMP_METRICS_DIR, ignore_errors=True)
+
+    def scrape(self):
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for name in ('app;dur=', 'db;dur=', 'tpl;dur=', 'cache;desc='):
+            with self.subTest(name=name):
+                self.assertIn(name, timing)
+        self.assertIn('queries"', timing)
+        self.assertIn('miss=', timing)
+
+    def test_metrics_are_protected(self):
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 403)
+        staff_client = Client()
+        staff_client.force_login(self.staff)
+        self.assertEqual(staff_client.get(url).status_code, 200)
+
+    def test_histograms_per_view(self):
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        body = self.scrape()
+        self.assertIn(
+            'yatube_request_duration_seconds_count'
+            '{view="posts:index",method="GET"} 2', body)
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",method="GET",le="+Inf"} 2', body)
+        self.assertIn('yatube_db_duration_seconds_sum{view="posts:index"}',
+                      body)
+        self.assertIn(
+            'yatube_cache_requests_total{view="posts:index",result="miss"}',
+            body)
+        self.assertIn('yatube_responses_total{status="200"}', body)
+
+    def test_processes_are_merged(self):
+        self.client.get(reverse('posts:index'))
+        other = metrics.Registry(name='other-process')
+        other.record('posts:index', 'GET', 200, metrics.RequestMetrics(), 20.0)
+        other.flush()
+        body = self.scrape()
+        self.assertIn(
+            'yatube_request_duration_seconds_count'
+            '{view="posts:index",method="GET"} 2', body)
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",method="GET",le="10.0"} 1', body)
+
+    def test_dead_processes_are_compacted(self):
+        dead_pid = finished_process_pid()
+        for index in range(2):
+            registry = metrics.Registry(name=f'{dead_pid}-{index}')
+            registry.record(
+                'posts:index', 'GET', 200, metrics.RequestMetrics(), 0.1)
+            registry.flush()
+        self.assertIn(
+            'yatube_request_duration_seconds_count'
+            '{view="posts:index",method="GET"} 2', self.scrape())
+        self.assertNotIn(f'{dead_pid}-0.json', os.listdir(TEMP_METRICS_DIR))
+        self.assertIn(metrics.AGGREGATE, os.listdir(TEMP_METRICS_DIR))
+        # Агрегат учитывается при каждом сборе, но только один раз.
+        self.assertIn(
+            'yatube_request_duration_seconds_count'
+            '{view="posts:index",method="GET"} 2', self.scrape())
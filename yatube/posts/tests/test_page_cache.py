@@ -0,0 +1,171 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from ..models import Comment, Follow, Group, Post, User
+from ..page_cache import LOOKUP_KEY
+
+
+class SharedPageCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_cached_page_is_personalized(self):
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        self.client.get(url)
+        response = self.reader_client.get(url)
+        self.assertTemplateNotUsed(response, 'posts/post_detail.html')
+        self.assertContains(response, 'Пользователь: reader')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertNotContains(response, 'редактировать запись')
+        response = self.author_client.get(url)
+        self.assertContains(response, 'Пользователь: author')
+        self.assertContains(response, 'редактировать запись')
+        response = self.client.get(url)
+        self.assertContains(response, 'Войти')
+        self.assertNotContains(response, 'csrfmiddlewaretoken')
+
+    def test_follow_button_reflects_current_user(self):
+        url = reverse('posts:profile', args=[self.author.username])
+        self.author_client.get(url)
+        self.assertContains(self.reader_client.get(url), 'Подписаться')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertContains(self.reader_client.get(url), 'Отписаться')
+        self.assertNotContains(self.author_client.get(url), 'Подписаться')
+
+    def test_changes_invalidate_cached_pages(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        ]
+        for url in urls:
+            self.client.get(url)
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Исправленный пост')
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertContains(
+            self.client.get(reverse('posts:post_detail', args=[self.post.pk])),
+            'Новое название',
+        )
+        self.author.first_name = 'Лев'
+        self.author.save()
+        self.assertContains(self.client.get(urls[0]), 'Автор: Лев')
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Тестовый пост')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_unchanged_page_is_not_modified(self):
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        self.assertIn('no-cache', response['Cache-Control'])
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_if_modified_since(self):
+        url = reverse('posts:api_post', args=[self.post.pk])
+        response = self.client.get(url)
+        response = self.reader_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_personalized_page_ignores_if_modified_since(self):
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Last-Modified'))
+        response = self.reader_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, 200)
+
+    def test_changes_produce_new_validator(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+            reverse('posts:follow_index'),
+        ]
+        etags = {url: self.reader_client.get(url)['ETag'] for url in urls}
+        self.post.comments.create(author=self.reader, text='Комментарий')
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+
+    def test_validator_depends_on_user(self):
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_follow_changes_follow_index(self):
+        url = reverse('posts:follow_index')
+        etag = self.reader_client.get(url)['ETag']
+        Follow.objects.filter(user=self.reader).delete()
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class InvalidationOnCommitTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(author=author, text='Тестовый пост')
+
+    def test_page_rendered_before_commit_is_not_reused(self):
+        # Страница, собранная до коммита, у другого запроса была бы по
+        # старому снимку базы: после коммита её нельзя отдавать.
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        with transaction.atomic():
+            Comment.objects.create(
+                post=self.post, author=self.post.author, text='Комментарий')
+            self.post.save()
+            self.client.get(url)
+            self.assertIsNotNone(
+                cache.get(LOOKUP_KEY.format('post', self.post.pk)))
+        self.assertIsNone(cache.get(LOOKUP_KEY.format('post', self.post.pk)))
+        response = self.client.get(url)
+        self.assertTemplateUsed(response, 'posts/post_detail.html')
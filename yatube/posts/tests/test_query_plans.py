@@ -0,0 +1,45 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..models import Comment, Follow, Group, Post, User
+from ..query_plans import collect_problems, explain, plan_problems, view_urls
+
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+@override_settings(CACHES=NO_CACHE)
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый пост')
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def test_views_use_indexes(self):
+        urls = view_urls()
+        self.assertEqual(len(urls), 8)
+        self.assertEqual(collect_problems(urls), [])
+
+    def test_sort_without_index_is_flagged(self):
+        query = Post.objects.filter(author=self.author).order_by('text')
+        sql = str(query.query)
+        problems = list(plan_problems(sql, explain(sql), {'posts_post'}))
+        self.assertEqual(problems, ['USE TEMP B-TREE FOR ORDER BY'])
+
+    def test_command(self):
+        out = StringIO()
+        call_command('explain_views', stdout=out)
+        self.assertIn('проблем не найдено', out.getvalue())
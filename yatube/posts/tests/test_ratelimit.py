@@ -0,0 +1,147 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core import metrics
+from core.ratelimit import client_ip
+from ..models import Comment, Post, User
+
+LIMITS = {
+    'post_create': {'user': (2, 60), 'ip': (3, 60)},
+    'add_comment': {'user': (2, 60), 'ip': (3, 60)},
+    'profile_follow': {'user': (1, 60), 'ip': (10, 60)},
+    'profile_unfollow': {'user': (1, 60), 'ip': (10, 60)},
+}
+
+
+@override_settings(RATE_LIMITS=LIMITS)
+class RateLimitTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.users = [
+            User.objects.create_user(username=f'user{index}')
+            for index in range(2)
+        ]
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.clear()
+        self.clients = []
+        for user in self.users:
+            client = Client()
+            client.force_login(user)
+            self.clients.append(client)
+
+    def comment(self, client, text='Комментарий'):
+        return client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': text})
+
+    def test_user_budget(self):
+        client = self.clients[0]
+        for _ in range(2):
+            self.assertEqual(self.comment(client).status_code, 302)
+        response = self.comment(client)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertTemplateUsed(response, 'core/429.html')
+        self.assertEqual(Comment.objects.count(), 2)
+        # Бюджеты представлений раздельные, а GET формы не тратит токены.
+        for _ in range(3):
+            response = client.get(reverse('posts:post_create'))
+            self.assertEqual(response.status_code, 200)
+        response = client.post(reverse('posts:post_create'), {'text': 'Пост'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_ip_budget_spans_users(self):
+        for client in self.clients:
+            self.assertEqual(self.comment(client).status_code, 302)
+        self.assertEqual(self.comment(self.clients[0]).status_code, 302)
+        # Ведро пользователя ещё не пусто, кончился бюджет IP.
+        self.assertEqual(self.comment(self.clients[1]).status_code, 429)
+        response = self.clients[1].post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'С другого адреса'}, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(RATE_LIMIT_TRUSTED_PROXIES=1)
+    def test_ip_budget_behind_proxy(self):
+        # Все запросы приходят с адреса прокси, ведро — по адресу клиента.
+        url = reverse('posts:add_comment', args=[self.post.pk])
+        for _ in range(2):
+            for client in self.clients:
+                client.post(url, {'text': 'Текст'},
+                            HTTP_X_FORWARDED_FOR='1.1.1.1')
+        response = self.clients[1].post(
+            url, {'text': 'Текст'}, HTTP_X_FORWARDED_FOR='1.1.1.1')
+        self.assertEqual(response.status_code, 429)
+        response = self.clients[1].post(
+            url, {'text': 'Текст'}, HTTP_X_FORWARDED_FOR='2.2.2.2')
+        self.assertEqual(response.status_code, 302)
+
+    def test_bucket_refills(self):
+        client = self.clients[0]
+        with mock.patch('core.ratelimit.time.time', return_value=1000):
+            self.comment(client)
+            self.comment(client)
+            self.assertEqual(self.comment(client).status_code, 429)
+        with mock.patch('core.ratelimit.time.time', return_value=1030):
+            self.assertEqual(self.comment(client).status_code, 302)
+            self.assertEqual(self.comment(client).status_code, 429)
+
+    def test_follow_is_limited_on_get(self):
+        client = self.clients[0]
+        url = reverse('posts:profile_follow', args=[self.author.username])
+        self.assertEqual(client.get(url).status_code, 302)
+        self.assertEqual(client.get(url).status_code, 429)
+
+    def test_counters(self):
+        client = self.clients[0]
+        for _ in range(3):
+            self.comment(client)
+        counters = metrics.registry.snapshot()['counters']
+        self.assertIn(
+            ['yatube_rate_limit_total',
+             (('view', 'add_comment'), ('result', 'allowed')), 2],
+            counters)
+        self.assertIn(
+            ['yatube_rate_limit_total',
+             (('view', 'add_comment'), ('result', 'user')), 1],
+            counters)
+
+
+class ClientIPTest(SimpleTestCase):
+    def ip(self, **meta):
+        return client_ip(RequestFactory().get('/', REMOTE_ADDR='10.0.0.1',
+                                              **meta))
+
+    def test_without_proxies_header_is_ignored(self):
+        self.assertEqual(
+            self.ip(HTTP_X_FORWARDED_FOR='1.1.1.1'), '10.0.0.1')
+
+    @override_settings(RATE_LIMIT_TRUSTED_PROXIES=1)
+    def test_trusted_proxy_hops(self):
+        self.assertEqual(self.ip(HTTP_X_FORWARDED_FOR='1.1.1.1'), '1.1.1.1')
+        # Левые адреса прислал клиент, доверяем только дописанному прокси.
+        self.assertEqual(
+            self.ip(HTTP_X_FORWARDED_FOR='6.6.6.6, 1.1.1.1'), '1.1.1.1')
+        self.assertEqual(self.ip(), '10.0.0.1')
+        with self.settings(RATE_LIMIT_TRUSTED_PROXIES=2):
+            self.assertEqual(
+                self.ip(HTTP_X_FORWARDED_FOR='6.6.6.6, 1.1.1.1, 2.2.2.2'),
+                '1.1.1.1')
+            self.assertEqual(
+                self.ip(HTTP_X_FORWARDED_FOR='1.1.1.1'), '10.0.0.1')
+
+    @override_settings(
+        RATE_LIMIT_TRUSTED_PROXIES=1, RATE_LIMIT_IP_HEADER='HTTP_X_REAL_IP')
+    def test_real_ip_header(self):
+        self.assertEqual(
+            self.ip(HTTP_X_REAL_IP='1.1.1.1',
+                    HTTP_X_FORWARDED_FOR='6.6.6.6'),
+            '1.1.1.1')
@@ -0,0 +1,63 @@
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.routers import (ReplicaRouter, cache_timeout, primary_pinned,
+                          request_routing)
+from ..models import Post, User
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_CACHE_TIMEOUT=30)
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_feed_reads_go_to_replica(self):
+        with request_routing(allow_replicas=True, pinned=False):
+            self.assertEqual(self.router.db_for_read(Post), 'replica1')
+            self.assertEqual(self.router.db_for_read(User), 'default')
+            self.assertEqual(cache_timeout(3600), 30)
+            self.assertFalse(primary_pinned())
+
+    def test_write_pins_request_to_primary(self):
+        with request_routing(allow_replicas=True, pinned=False) as state:
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+            self.assertTrue(primary_pinned())
+        self.assertTrue(state.wrote)
+
+    def test_pinned_and_unsafe_requests_use_primary(self):
+        with request_routing(allow_replicas=True, pinned=True):
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+        with request_routing(allow_replicas=False, pinned=False):
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_migrations_only_on_primary(self):
+        self.assertTrue(self.router.allow_migrate('default', 'posts'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'posts'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_PIN_SECONDS=10)
+class ReplicaPinCookieTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_write_sets_pin_cookie(self):
+        response = self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Комментарий'},
+        )
+        cookie = response.cookies['primary_pin']
+        self.assertEqual(cookie['max-age'], 10)
+        self.assertTrue(cookie['httponly'])
+
+    def test_read_does_not_set_pin_cookie(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('primary_pin', response.cookies)
@@ -0,0 +1,71 @@
+from django.contrib.admin.sites import site
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Post, User
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост про котиков')
+        cls.other = Post.objects.create(
+            author=cls.author, text='Пост про собак')
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params})
+        return response, list(response.context['page_obj'])
+
+    def test_search_by_post_and_comment_text(self):
+        Comment.objects.create(
+            post=self.other, author=self.author, text='Собаки лучше котиков')
+        response, posts = self.search('котиков')
+        self.assertEqual(response.status_code, 200)
+        # Совпадение в тексте поста весит больше, чем в комментарии.
+        self.assertEqual(posts, [self.post, self.other])
+
+    def test_index_follows_edits_and_deletes(self):
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Пост про попугаев'
+        post.save()
+        self.assertEqual(self.search('котик')[1], [])
+        self.assertEqual(self.search('попугаев')[1], [post])
+        post.delete()
+        self.assertEqual(self.search('попугаев')[1], [])
+
+    def test_query_is_escaped(self):
+        response, posts = self.search('"котиков")(*:^')
+        self.assertEqual(posts, [self.post])
+        self.assertEqual(self.search('')[1], [])
+
+    @override_settings(AMOUNT_OF_POSTS=2)
+    def test_cursor_pagination(self):
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост про ежей {i}')
+            for i in range(5)
+        )
+        seen = []
+        response, posts = self.search('ежей')
+        while True:
+            seen.extend(posts)
+            paginator = response.context['page_obj'].paginator
+            if not paginator.next_cursor:
+                break
+            response, posts = self.search(
+                'ежей', cursor=paginator.next_cursor)
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+        previous, _ = self.search(
+            'ежей', cursor=paginator.previous_cursor)
+        self.assertEqual(previous.context['page_obj'].number, 2)
+
+    def test_admin_uses_index(self):
+        request = RequestFactory().get('/')
+        admin = site._registry[Post]
+        queryset, distinct = admin.get_search_results(
+            request, Post.objects.all(), 'собак')
+        self.assertEqual(list(queryset), [self.other])
+        self.assertIn('posts_post_fts', str(queryset.query))
@@ -0,0 +1,39 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core.sqlite import configure_connection, pragma, pragma_statements
+
+
+class SQLiteTuningTest(TestCase):
+    def test_pragmas_are_ordered(self):
+        statements = pragma_statements({
+            'mmap_size': 1, 'journal_mode': 'WAL', 'busy_timeout': 10,
+            'auto_vacuum': 'INCREMENTAL',
+        })
+        self.assertEqual(statements, [
+            'PRAGMA busy_timeout = 10',
+            'PRAGMA auto_vacuum = INCREMENTAL',
+            'PRAGMA journal_mode = WAL',
+            'PRAGMA mmap_size = 1',
+        ])
+
+    @override_settings(SQLITE_PRAGMAS={
+        'busy_timeout': 1234, 'cache_size': -2048})
+    def test_connection_hook_applies_settings(self):
+        configure_connection(sender=None, connection=connection)
+        with connection.cursor() as cursor:
+            self.assertEqual(pragma(cursor, 'busy_timeout'), 1234)
+            self.assertEqual(pragma(cursor, 'cache_size'), -2048)
+
+
+class SQLiteMaintenanceTest(TransactionTestCase):
+    def test_maintenance_command(self):
+        out = StringIO()
+        call_command('sqlite_maintenance', '--full-check', stdout=out)
+        output = out.getvalue()
+        self.assertIn('integrity_check: ok', output)
+        self.assertIn('ANALYZE', output)
+        self.assertIn('Обслуживание завершено.', output)
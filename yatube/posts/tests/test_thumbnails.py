@@ -0,0 +1,199 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.kvstore import KVStore
+
+from ..models import Post, User
+from ..templatetags.post_images import post_thumbnail
+from ..thumbnails import FAILED_KEY, cached_thumbnail, generate_thumbnail
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_KVSTORE_DIR = tempfile.mkdtemp()
+TEMP_KVSTORE_PATH = os.path.join(TEMP_KVSTORE_DIR, 'kvstore.sqlite3')
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def tearDownModule():
+    shutil.rmtree(TEMP_KVSTORE_DIR, ignore_errors=True)
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_KVSTORE_PATH=TEMP_KVSTORE_PATH,
+    THUMBNAIL_WORKERS=0, IMAGE_PROCESSES=0)
+class ThumbnailTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='username')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def uploaded(self, name='small.gif'):
+        return SimpleUploadedFile(
+            name=name, content=SMALL_GIF, content_type='image/gif')
+
+    def test_post_create_generates_thumbnail(self):
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост с картинкой',
+            'image': self.uploaded(),
+        })
+        post = Post.objects.get()
+        thumbnail = cached_thumbnail(post.image.name)
+        self.assertIsNotNone(thumbnail)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk]))
+        self.assertContains(response, thumbnail.url)
+
+    def test_missing_thumbnail_falls_back_to_original(self):
+        post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=self.uploaded('fallback.gif'),
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, post.image.url)
+        self.assertIsNotNone(cached_thumbnail(post.image.name))
+
+    def test_failed_thumbnail_is_not_rescheduled(self):
+        post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=self.uploaded('broken.gif'),
+        )
+        with mock.patch(
+            'posts.thumbnails.generate_thumbnail',
+            side_effect=OSError('broken'),
+        ) as generate, self.assertLogs('posts.thumbnails', 'ERROR'):
+            for _ in range(3):
+                self.assertIsNone(post_thumbnail(post))
+        self.assertEqual(generate.call_count, 1)
+        self.assertIsNone(cached_thumbnail(post.image.name))
+        call_command('generate_thumbnails', workers=1, stdout=StringIO())
+        self.assertIsNotNone(cached_thumbnail(post.image.name))
+
+    def test_command_generates_missing_thumbnails(self):
+        post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=self.uploaded('command.gif'),
+        )
+        self.assertIsNone(cached_thumbnail(post.image.name))
+        out = StringIO()
+        call_command('generate_thumbnails', '--workers=2', stdout=out)
+        self.assertIsNotNone(cached_thumbnail(post.image.name))
+        self.assertIn('Создано миниатюр: 1', out.getvalue())
+
+    def test_command_continues_after_failure(self):
+        broken, post = (
+            Post.objects.create(
+                author=self.user,
+                text='Пост с картинкой',
+                image=self.uploaded(name),
+            )
+            for name in ('corrupt.gif', 'fine.gif')
+        )
+
+        def generate(name):
+            if name == broken.image.name:
+                raise OSError('broken')
+            return generate_thumbnail(name)
+
+        out = StringIO()
+        with mock.patch(
+            'posts.management.commands.generate_thumbnails'
+            '.generate_thumbnail',
+            side_effect=generate,
+        ), self.assertLogs('posts.thumbnails', 'ERROR'):
+            call_command('generate_thumbnails', '--workers=1', stdout=out)
+        self.assertIn(
+            'Создано миниатюр: 1, уже были готовы: 0, с ошибками: 1',
+            out.getvalue())
+        self.assertIsNotNone(cached_thumbnail(post.image.name))
+        self.assertTrue(cache.get(FAILED_KEY.format(broken.image.name)))
+
+    def test_force_removes_previous_geometry(self):
+        post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=self.uploaded('geometry.gif'),
+        )
+        call_command('generate_thumbnails', stdout=StringIO())
+        old = cached_thumbnail(post.image.name)
+        self.assertTrue(old.exists())
+        with self.settings(POST_THUMBNAIL_GEOMETRY='40x30'):
+            call_command('generate_thumbnails', force=True, stdout=StringIO())
+            new = cached_thumbnail(post.image.name)
+        self.assertEqual((new.width, new.height), (40, 30))
+        self.assertFalse(old.exists())
+
+    @override_settings(POST_IMAGE_MAX_SIZE=100)
+    def test_large_original_downscaled(self):
+        content = BytesIO()
+        Image.new('RGB', (400, 200), 'red').save(content, 'JPEG')
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'Большая фотография',
+            'image': SimpleUploadedFile(
+                'photo.jpg', content.getvalue(), 'image/jpeg'),
+        })
+        post = Post.objects.get()
+        with Image.open(post.image.path) as image:
+            self.assertEqual((image.format, image.size), ('JPEG', (100, 50)))
+        self.assertIsNotNone(cached_thumbnail(post.image.name))
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_KVSTORE_PATH=TEMP_KVSTORE_PATH)
+class KVStoreTest(TransactionTestCase):
+    def setUp(self):
+        self.store = KVStore()
+        self.store._delete_raw(*self.store._find_keys_raw(''))
+
+    def test_values_survive_new_instance(self):
+        self.store._set_raw('sorl-thumbnail||image||a', '{"size": [1, 1]}')
+        self.assertEqual(
+            KVStore()._get_raw('sorl-thumbnail||image||a'),
+            '{"size": [1, 1]}',
+        )
+        self.assertEqual(
+            KVStore()._find_keys_raw('sorl-thumbnail||image||'),
+            ['sorl-thumbnail||image||a'],
+        )
+
+    def test_prefetch_fills_lru(self):
+        self.store._set_raw('a', '1')
+        reader = KVStore()
+        reader.prefetch_raw(['a', 'b'])
+        self.store._connection().execute('DELETE FROM kvstore')
+        self.assertEqual(reader._get_raw('a'), '1')
+        self.assertIsNone(reader._get_raw('b'))
+
+    @override_settings(THUMBNAIL_KVSTORE_LRU_SIZE=1)
+    def test_lru_evicts_oldest(self):
+        self.store._set_raw('a', '1')
+        self.store._set_raw('b', '2')
+        self.assertEqual(list(self.store._lru), [
+            (self.store.path, 'b'),
+        ])
+        self.assertEqual(self.store._get_raw('a'), '1')
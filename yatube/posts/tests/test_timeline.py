@@ -0,0 +1,58 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry, User
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.old_post = Post.objects.create(author=cls.author, text='Старый')
+
+    def timeline_posts(self):
+        return list(
+            TimelineEntry.objects.filter(user=self.reader)
+            .values_list('post_id', flat=True)
+        )
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        Post.objects.create(author=self.other, text='Чужой')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.timeline_posts(), [self.old_post.pk])
+        follow.delete()
+        self.assertEqual(self.timeline_posts(), [])
+
+    def test_new_post_fans_out_to_followers(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый')
+        Post.objects.create(author=self.other, text='Чужой')
+        self.assertEqual(self.timeline_posts(),
+                         [new_post.pk, self.old_post.pk])
+
+    @override_settings(TIMELINE_MAX_LENGTH=2)
+    def test_timeline_is_capped(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(3)
+        ]
+        self.assertEqual(self.timeline_posts(),
+                         [new_posts[2].pk, new_posts[1].pk])
+
+    def test_rebuild_command_repairs_timeline(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.timeline_posts(), [self.old_post.pk])
+
+    def test_follow_index_reads_timeline(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [self.old_post])
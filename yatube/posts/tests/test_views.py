@@ -5,10 +5,12 @@ from django import forms
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Follow, Group, Post, User
+from ..models import Follow, Group, Post, User, UserCounters
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -151,6 +153,39 @@ class PostPagesTest(TestCase):
         self.page_contains_amount_of_records(2, Post.objects.count()
                                              - settings.AMOUNT_OF_POSTS)
 
+    def test_cursor_pages_cover_whole_feed(self):
+        reverse_names = {
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        }
+        for reverse_name in reverse_names:
+            with self.subTest(reverse_name=reverse_name):
+                first_page = self.client.get(reverse_name).context['page_obj']
+                self.assertEqual(len(first_page), settings.AMOUNT_OF_POSTS)
+                self.assertFalse(first_page.has_previous())
+                second_page = self.client.get(
+                    reverse_name,
+                    {'cursor': first_page.paginator.next_cursor},
+                ).context['page_obj']
+                self.assertEqual(second_page.number, 2)
+                self.assertEqual(len(second_page), Post.objects.count()
+                                 - settings.AMOUNT_OF_POSTS)
+                self.assertFalse(second_page.has_next())
+                back_page = self.client.get(
+                    reverse_name,
+                    {'cursor': second_page.paginator.previous_cursor},
+                ).context['page_obj']
+                self.assertEqual(list(back_page), list(first_page))
+                self.assertFalse(back_page.has_previous())
+
+    def test_broken_cursor_shows_first_page(self):
+        response = self.client.get(reverse('posts:index'),
+                                   {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.context['page_obj'].number, 1)
+        self.assertEqual(len(response.context['page_obj']),
+                         settings.AMOUNT_OF_POSTS)
+
     def test_post_not_in_other_group(self):
         response = (self.authorized_client.
                     get(reverse('posts:group_list',
@@ -227,3 +262,201 @@ class PostPagesTest(TestCase):
         response = self.authorized_client.get(
             reverse('posts:follow_index'))
         self.assertNotContains(response, 'post')
+
+
+class FeedCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='username')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(settings.AMOUNT_OF_POSTS + 1):
+            Post.objects.create(
+                author=cls.user,
+                text=f'Пост номер {i}',
+                group=cls.group,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pages_are_cached_separately(self):
+        reverse_names = {
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        }
+        for reverse_name in reverse_names:
+            with self.subTest(reverse_name=reverse_name):
+                first_page = self.client.get(reverse_name)
+                second_page = self.client.get(reverse_name, {'page': 2})
+                self.assertContains(first_page, 'Пост номер 10')
+                self.assertNotContains(second_page, 'Пост номер 10')
+                self.assertContains(second_page, 'Пост номер 0')
+
+    def test_new_post_invalidates_cached_feeds(self):
+        reverse_names = {
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        }
+        for reverse_name in reverse_names:
+            self.client.get(reverse_name)
+        Post.objects.create(
+            author=self.user,
+            text='Свежий пост',
+            group=self.group,
+        )
+        for reverse_name in reverse_names:
+            with self.subTest(reverse_name=reverse_name):
+                self.assertContains(self.client.get(reverse_name),
+                                    'Свежий пост')
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='username')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def add_post(self):
+        post = Post.objects.create(
+            author=self.user,
+            text='Тестовый пост',
+            group=self.group,
+        )
+        post.comments.create(author=self.reader, text='Комментарий')
+        return post
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        post = self.add_post()
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+            reverse('posts:post_detail', args=[post.pk]),
+            reverse('posts:follow_index'),
+        ]
+        single_row = {url: self.count_queries(url) for url in urls}
+        for _ in range(settings.AMOUNT_OF_POSTS - 1):
+            post.comments.create(author=self.reader, text='Комментарий')
+            self.add_post()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), single_row[url])
+
+
+class CachedCountPaginatorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='username')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, group=cls.group, text=f'Пост {i}')
+            for i in range(settings.AMOUNT_OF_POSTS * 20)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_navigation_shows_window_of_pages(self):
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            {'page': 10},
+        )
+        paginator = response.context['page_obj'].paginator
+        self.assertEqual(list(paginator.page_window), [8, 9, 10, 11, 12])
+        self.assertContains(response, '?page=12')
+        self.assertNotContains(response, '?page=13"')
+        self.assertContains(response, '?page=20')
+
+    def test_window_is_clamped_to_last_page(self):
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            {'page': 20},
+        )
+        paginator = response.context['page_obj'].paginator
+        self.assertEqual(list(paginator.page_window), [16, 17, 18, 19, 20])
+
+    def test_count_is_cached(self):
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        self.client.get(url, {'page': 1})
+        Post.objects.create(author=self.user, group=self.group, text='Ещё')
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'page': 1})
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 20)
+
+    def test_profile_count_comes_from_counters(self):
+        UserCounters.objects.filter(user=self.user).update(
+            posts_count=settings.AMOUNT_OF_POSTS * 3)
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+            {'page': 1},
+        )
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 3)
+
+
+@override_settings(COMMENTS_BATCH_SIZE=2)
+class CommentsLoadMoreTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='username')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        for i in range(5):
+            cls.post.comments.create(author=cls.user, text=f'Комментарий {i}')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_detail_renders_first_batch(self):
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['Комментарий 4', 'Комментарий 3'],
+        )
+        self.assertContains(
+            response, reverse('posts:post_comments', args=[self.post.pk]))
+
+    def test_endpoint_returns_following_batches(self):
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        url = (f'{reverse("posts:post_comments", args=[self.post.pk])}'
+               f'?cursor={response.context["comments"].paginator.next_cursor}')
+        html = ''
+        while url:
+            with self.assertNumQueries(1):
+                data = self.client.get(url).json()
+            html += data['html']
+            url = data['next']
+        for i in range(3):
+            self.assertIn(f'Комментарий {i}', html)
+        self.assertNotIn('Комментарий 3', html)
+
+    def test_endpoint_for_missing_post(self):
+        response = self.client.get(
+            reverse('posts:post_comments', args=[self.post.pk + 1]))
+        self.assertEqual(response.status_code, 404)
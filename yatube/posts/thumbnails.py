@@ -0,0 +1,150 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+
+from .cache_versions import bump_feed_versions, feed_key, post_feeds
+from .images import normalize_image
+
+logger = logging.getLogger(__name__)
+
+# Картинка, для которой не удалось создать миниатюру: пока ключ жив,
+# показы поста не ставят её в пул заново.
+FAILED_KEY = 'thumbnail-failed:{}'
+
+
+class PostThumbnailBackend(ThumbnailBackend):
+    def get_thumbnail_file(self, file_, geometry_string, **options):
+        """Файл, который вернул бы get_thumbnail, без создания миниатюры."""
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def get_cached_thumbnail(self, file_, geometry_string, **options):
+        """Как get_thumbnail, но только ищет готовую миниатюру в KV-store."""
+        return default.kvstore.get(
+            self.get_thumbnail_file(file_, geometry_string, **options))
+
+
+backend = PostThumbnailBackend()
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
+
+
+def generate_thumbnail(image):
+    return backend.get_thumbnail(
+        image,
+        settings.POST_THUMBNAIL_GEOMETRY,
+        **settings.POST_THUMBNAIL_OPTIONS,
+    )
+
+
+def prepare_original(name):
+    """Нормализует оригинал и забывает его устаревшие метаданные."""
+    if normalize_image(name):
+        default.kvstore.delete(ImageFile(name), delete_thumbnails=False)
+
+
+def cached_thumbnail(image):
+    return backend.get_cached_thumbnail(
+        image,
+        settings.POST_THUMBNAIL_GEOMETRY,
+        **settings.POST_THUMBNAIL_OPTIONS,
+    )
+
+
+def prefetch_thumbnails(posts):
+    """Одним запросом подгружает метаданные миниатюр для страницы ленты."""
+    prefetch_raw = getattr(default.kvstore, 'prefetch_raw', None)
+    if prefetch_raw is None:
+        return
+    prefetch_raw([
+        add_prefix(backend.get_thumbnail_file(
+            post.image.name,
+            settings.POST_THUMBNAIL_GEOMETRY,
+            **settings.POST_THUMBNAIL_OPTIONS,
+        ).key)
+        for post in posts if post.image
+    ])
+
+
+def mark_failed(name):
+    """Логирует ошибку миниатюры и откладывает повторные попытки.
+
+    Вызывается из обработчика исключения.
+    """
+    logger.exception('Не удалось создать миниатюру %s', name)
+    cache.set(FAILED_KEY.format(name), True, settings.THUMBNAIL_RETRY_TIMEOUT)
+
+
+def _generate_for_post(name, post_id, author_id, group_id):
+    try:
+        prepare_original(name)
+        generate_thumbnail(name)
+    except Exception:
+        mark_failed(name)
+    else:
+        # Ленты могли закэшировать запасной вариант без миниатюры.
+        bump_feed_versions(
+            feed_key('post', post_id),
+            *post_feeds(author_id, group_id),
+        )
+    finally:
+        with _lock:
+            _pending.discard(name)
+
+
+def _submit(name, post_id, author_id, group_id):
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    args = (name, post_id, author_id, group_id)
+    if settings.THUMBNAIL_WORKERS:
+        get_executor().submit(_generate_for_post, *args)
+    else:
+        _generate_for_post(*args)
+
+
+def schedule_thumbnail(post):
+    """Нормализует картинку поста и создаёт миниатюру вне запроса.
+
+    Задача уходит в пул после коммита транзакции; при THUMBNAIL_WORKERS = 0
+    миниатюра создаётся прямо в потоке запроса, это удобно в тестах.
+    После неудачи картинка не ставится в пул THUMBNAIL_RETRY_TIMEOUT
+    секунд.
+    """
+    if not post.image or cache.get(FAILED_KEY.format(post.image.name)):
+        return
+    args = (post.image.name, post.pk, post.author_id, post.group_id)
+    transaction.on_commit(lambda: _submit(*args))
@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+
+from .models import Follow, Post, TimelineEntry
+
+
+def trim_timelines(user_ids):
+    """Оставляет в лентах не больше TIMELINE_MAX_LENGTH записей."""
+    limit = settings.TIMELINE_MAX_LENGTH
+    oldest_kept = TimelineEntry.objects.filter(
+        user_id=OuterRef('user_id'),
+    ).order_by('-created', '-post_id').values('created')[limit - 1:limit]
+    TimelineEntry.objects.filter(
+        user_id__in=user_ids,
+        created__lt=Subquery(oldest_kept),
+    ).delete()
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    follower_ids = list(
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+    )
+    if not follower_ids:
+        return
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post.pk,
+                author_id=post.author_id,
+                created=post.created,
+            )
+            for user_id in follower_ids
+        ],
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim_timelines(follower_ids)
+
+
+def backfill_timeline(user_id, author_id):
+    """Добавляет в ленту последние посты автора после подписки."""
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-created', '-pk'
+    ).values_list('pk', 'created')[:settings.TIMELINE_MAX_LENGTH]
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                created=created,
+            )
+            for post_id, created in posts
+        ],
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim_timelines([user_id])
+
+
+def prune_timeline(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild_timeline(user_id):
+    """Собирает ленту пользователя заново по его текущим подпискам."""
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    posts = Post.objects.filter(author__following__user_id=user_id).order_by(
+        '-created', '-pk'
+    ).values_list('pk', 'author_id', 'created')[:settings.TIMELINE_MAX_LENGTH]
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                created=created,
+            )
+            for post_id, author_id, created in posts
+        ],
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+    )
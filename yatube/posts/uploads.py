@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загружаемые файлы сразу на диск, не держа их в памяти.
+
+    Всё, что приходит сверх UPLOAD_MAX_SIZE байт, отбрасывается, а у
+    файла выставляется too_large: форма покажет ошибку, а память и диск
+    воркера не зависят от размера присланного файла.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.too_large = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.too_large:
+            return None
+        if start + len(raw_data) > settings.UPLOAD_MAX_SIZE:
+            self.too_large = True
+            self.file.truncate(0)
+            return None
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.too_large = self.too_large
+        return file
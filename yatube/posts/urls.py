@@ -1,22 +1,46 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
     path('create/', views.post_create, name='post_create'),
+    path('search/', views.search, name='search'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments',
+    ),
     path(
         'posts/<int:post_id>/comment/',
         views.add_comment,
         name='add_comment'
     ),
     path('follow/', views.follow_index, name='follow_index'),
+    path('api/posts/', api.posts, name='api_posts'),
+    path('api/posts/<int:post_id>/', api.post, name='api_post'),
+    path(
+        'api/posts/<int:post_id>/comments/',
+        api.post_comments,
+        name='api_post_comments',
+    ),
+    path(
+        'api/groups/<slug:slug>/posts/',
+        api.group_posts,
+        name='api_group_posts',
+    ),
+    path(
+        'api/users/<str:username>/posts/',
+        api.profile_posts,
+        name='api_profile_posts',
+    ),
+    path('api/follow/', api.follow_posts, name='api_follow'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -1,8 +1,192 @@
+import base64
+import binascii
+import hashlib
+
 from django.conf import settings
+from django.core.cache import cache
 from django.core.paginator import Paginator
+from django.db.models import Max, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+def encode_cursor(direction, number, value, pk):
+    """Упаковывает позицию в ленте в непрозрачный токен для URL."""
+    raw = f'{direction}|{number}|{value}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, parse_value=parse_datetime):
+    """Распаковывает токен; для испорченного токена возвращает None."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, number, value, pk = raw.decode().split('|')
+        value = parse_value(value)
+        number, pk = int(number), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or value is None:
+        return None
+    return direction, max(number, 1), value, pk
+
+
+class CursorPaginator(Paginator):
+    """Паджинатор без COUNT(*) и OFFSET.
+
+    Каждая страница выбирается условием по паре (created, id) и
+    ограничивается LIMIT, поэтому стоимость запроса не зависит от того,
+    насколько глубоко пользователь пролистал ленту. Паджинатор
+    описывает одну страницу: count и num_pages считаются от неё, а
+    наличие соседних страниц определяется по лишней выбранной строке.
+    """
+
+    cursor_based = True
+
+    def __init__(self, object_list, per_page,
+                 created_field='created', pk_field='pk'):
+        super().__init__(object_list, per_page)
+        self.created_field = created_field
+        self.pk_field = pk_field
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    def format_value(self, value):
+        return value.isoformat()
+
+    def parse_value(self, raw):
+        return parse_datetime(raw)
+
+    def get_cursor_page(self, token):
+        cursor = decode_cursor(token, self.parse_value) if token else None
+        created, pk = self.created_field, self.pk_field
+        if cursor is None:
+            rows = list(
+                self.object_list.order_by(f'-{created}', f'-{pk}')
+                [:self.per_page + 1]
+            )
+            return self._build_page(rows, 1, len(rows) > self.per_page)
+        direction, number, value, key = cursor
+        if direction == CURSOR_NEXT:
+            rows = list(
+                self.object_list.filter(
+                    Q(**{f'{created}__lt': value})
+                    | Q(**{created: value, f'{pk}__lt': key})
+                ).order_by(f'-{created}', f'-{pk}')[:self.per_page + 1]
+            )
+            return self._build_page(
+                rows, max(number, 2), len(rows) > self.per_page)
+        rows = list(
+            self.object_list.filter(
+                Q(**{f'{created}__gt': value})
+                | Q(**{created: value, f'{pk}__gt': key})
+            ).order_by(created, pk)[:self.per_page + 1]
+        )
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return self._build_page(
+            rows, max(number, 2) if has_previous else 1, True)
+
+    def _build_page(self, rows, number, has_next):
+        rows = rows[:self.per_page]
+        self.num_pages = number + 1 if has_next else number
+        self.count = (number - 1) * self.per_page + len(rows)
+        if has_next:
+            self.next_cursor = self._cursor(CURSOR_NEXT, rows[-1], number + 1)
+        if number > 1 and rows:
+            self.previous_cursor = self._cursor(
+                CURSOR_PREVIOUS, rows[0], number - 1)
+        return self._get_page(rows, number, self)
+
+    def _cursor(self, direction, obj, number):
+        return encode_cursor(
+            direction,
+            number,
+            self.format_value(getattr(obj, self.created_field)),
+            getattr(obj, self.pk_field),
+        )
+
+
+class CachedCountPaginator(Paginator):
+    """Паджинатор по номерам страниц без COUNT(*) на каждый запрос.
+
+    Общее число объектов берётся из переданного счётчика или из кэша
+    (не старше PAGINATOR_COUNT_TIMEOUT секунд). В навигации показывается
+    только окно из PAGINATOR_WINDOW страниц вокруг текущей.
+    """
+
+    def __init__(self, object_list, per_page, count=None, window=None):
+        super().__init__(object_list, per_page)
+        if count is not None:
+            self.count = count
+        self.window = window or settings.PAGINATOR_WINDOW
+        self.number = 1
+
+    @cached_property
+    def count(self):
+        sql, params = self.object_list.query.sql_with_params()
+        digest = hashlib.md5(repr((sql, params)).encode()).hexdigest()
+        key = f'paginator-count:{digest}'
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, settings.PAGINATOR_COUNT_TIMEOUT)
+        return count
+
+    def get_page(self, number):
+        page = super().get_page(number)
+        self.number = page.number
+        return page
+
+    @property
+    def page_window(self):
+        start = max(1, min(
+            self.number - self.window // 2,
+            self.num_pages - self.window + 1,
+        ))
+        end = min(self.num_pages, start + self.window - 1)
+        return range(start, end + 1)
+
+
+class EstimatedCountPaginator(CachedCountPaginator):
+    """Паджинатор для списков админки.
+
+    Без фильтров число строк оценивается по наибольшему id: MAX по
+    первичному ключу берётся из индекса, а не сканированием таблицы.
+    Для отфильтрованных списков точное число кэшируется, как в
+    CachedCountPaginator.
+    """
+
+    def __init__(self, object_list, per_page, orphans=0,
+                 allow_empty_first_page=True):
+        super().__init__(object_list, per_page)
+        self.orphans = int(orphans)
+        self.allow_empty_first_page = allow_empty_first_page
+
+    @cached_property
+    def count(self):
+        if self.object_list.query.where:
+            return super().count
+        return self.object_list.order_by().aggregate(
+            estimate=Max('pk'))['estimate'] or 0
+
 
+def create_page_obj(request, post_list, count=None, **cursor_fields):
+    """Возвращает страницу ленты.
 
-def create_page_obj(request, post_list):
-    paginator = Paginator(post_list, settings.AMOUNT_OF_POSTS)
+    По умолчанию листаем курсорами (?cursor=...); старые ссылки вида
+    ?page=N продолжают работать через CachedCountPaginator, которому
+    можно передать готовое число объектов в count. cursor_fields
+    переопределяют поля ключа, если лента строится не по Post.
+    """
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    if page_number is not None:
+        paginator = CachedCountPaginator(
+            post_list, settings.AMOUNT_OF_POSTS, count=count)
+        return paginator.get_page(page_number)
+    paginator = CursorPaginator(
+        post_list, settings.AMOUNT_OF_POSTS, **cursor_fields)
+    return paginator.get_cursor_page(request.GET.get('cursor'))
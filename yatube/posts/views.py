@@ -1,13 +1,26 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.urls import reverse
 
+from core.ratelimit import rate_limit
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utils import create_page_obj
-
-
+from .models import Comment, Follow, Group, Post, PostQuerySet, User
+from .page_cache import (conditional_page, follow_page_feeds,
+                         group_page_feeds, index_page_feeds,
+                         post_page_feeds, profile_page_feeds,
+                         shared_page_cache)
+from .search import SearchPaginator
+from .thumbnails import schedule_thumbnail
+from .utils import CursorPaginator, create_page_obj
+
+
+@conditional_page(index_page_feeds)
+@shared_page_cache(index_page_feeds)
 def index(request):
-    post_list = Post.objects.all()
+    post_list = Post.objects.for_feed()
     page_obj = create_page_obj(request, post_list)
     context = {
         'page_obj': page_obj,
@@ -15,9 +28,22 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = SearchPaginator(query, settings.AMOUNT_OF_POSTS)
+    page_obj = paginator.get_cursor_page(request.GET.get('cursor'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@conditional_page(group_page_feeds)
+@shared_page_cache(group_page_feeds)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.select_related('group')
+    post_list = group.posts.for_feed()
     page_obj = create_page_obj(request, post_list)
     context = {
         'group': group,
@@ -26,42 +52,73 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_page(profile_page_feeds)
+@shared_page_cache(profile_page_feeds)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related('author')
-    page_obj = create_page_obj(request, post_list)
-    post_count = post_list.count()
-    following = False
-    if request.user.is_authenticated and Follow.objects.filter(
-        user=request.user,
-        author=author,
-    ).exists():
-        following = True
+    author = get_object_or_404(
+        User.objects.select_related('counters'),
+        username=username,
+    )
+    post_list = author.posts.for_feed()
+    counters = getattr(author, 'counters', None)
+    page_obj = create_page_obj(
+        request,
+        post_list,
+        count=counters.posts_count if counters else None,
+    )
     context = {
         'author': author,
         'page_obj': page_obj,
-        'post_count': post_count,
-        'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+def comments_page(request, comment_list):
+    """Порция из COMMENTS_BATCH_SIZE комментариев после курсора."""
+    paginator = CursorPaginator(comment_list, settings.COMMENTS_BATCH_SIZE)
+    return paginator.get_cursor_page(request.GET.get('cursor'))
+
+
+@conditional_page(post_page_feeds)
+@shared_page_cache(post_page_feeds)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comment_list = post.comments.select_related('post')
-    comments = create_page_obj(request, comment_list)
-    author_post_count = post.author.posts.select_related('author').count()
+    post = get_object_or_404(Post.objects.for_detail(), pk=post_id)
+    comment_list = post.comments.for_post()
+    comments = comments_page(request, comment_list)
     form = CommentForm(request.POST or None)
     context = {
         'post': post,
-        'author_post_count': author_post_count,
         'comments': comments,
         'form': form,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@conditional_page(post_page_feeds)
+@shared_page_cache(post_page_feeds)
+def post_comments(request, post_id):
+    """Следующая порция комментариев для кнопки «Показать ещё».
+
+    Отдаёт JSON с HTML-фрагментом и адресом следующей порции; пустой
+    next означает, что комментарии закончились.
+    """
+    comments = comments_page(request, Comment.objects.filter(
+        post_id=post_id).for_post())
+    if not comments and not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    next_url = None
+    if comments.has_next():
+        next_url = (f'{reverse("posts:post_comments", args=[post_id])}'
+                    f'?cursor={comments.paginator.next_cursor}')
+    return JsonResponse({
+        'html': render_to_string(
+            'posts/includes/comment_list.html', {'comments': comments}),
+        'next': next_url,
+    })
+
+
 @login_required
+@rate_limit('post_create')
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -71,6 +128,7 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        schedule_thumbnail(post)
         return redirect('posts:profile', post.author)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -78,7 +136,7 @@ def post_create(request):
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
-    if post.author != request.user:
+    if post.author_id != request.user.pk:
         return redirect('posts:post_detail', post_id)
     form = PostForm(
         request.POST or None,
@@ -87,6 +145,8 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         post.save()
+        if 'image' in form.changed_data:
+            schedule_thumbnail(post)
         return redirect('posts:post_detail', post.pk)
     context = {
         'is_edit': True,
@@ -97,8 +157,9 @@ def post_edit(request, post_id):
 
 
 @login_required
+@rate_limit('add_comment')
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
@@ -109,14 +170,25 @@ def add_comment(request, post_id):
 
 
 @login_required
+@conditional_page(follow_page_feeds)
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = create_page_obj(request, post_list)
+    entries = request.user.timeline.select_related(
+        'post__author',
+        'post__group',
+    ).only(
+        'user',
+        'created',
+        'post',
+        *(f'post__{field}' for field in PostQuerySet.FEED_FIELDS),
+    )
+    page_obj = create_page_obj(request, entries, pk_field='post_id')
+    page_obj.object_list = [entry.post for entry in page_obj]
     context = {'page_obj': page_obj}
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@rate_limit('profile_follow', methods=None)
 def profile_follow(request, username):
     author = User.objects.get(username=username)
     if author != request.user:
@@ -125,6 +197,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@rate_limit('profile_unfollow', methods=None)
 def profile_unfollow(request, username):
     author = User.objects.get(username=username)
     Follow.objects.get(user=request.user, author=author).delete()
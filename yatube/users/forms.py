@@ -1,6 +1,9 @@
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
+from django.template.loader import render_to_string
 
+from core.jobs import enqueue, worker_alive
 from .models import User
+from .tasks import send_mail
 
 
 class CreationForm(UserCreationForm):
@@ -13,3 +16,26 @@ class CreationForm(UserCreationForm):
             'username',
             'email'
         )
+
+
+class QueuedPasswordResetForm(PasswordResetForm):
+    """Письмо сброса пароля собирается в запросе, а отправляется воркером.
+
+    Если manage.py run_jobs не запущен, письмо отправляется сразу, как
+    в PasswordResetForm, а не ждёт в очереди.
+    """
+
+    def send_mail(self, subject_template_name, email_template_name,
+                  context, from_email, to_email,
+                  html_email_template_name=None):
+        if not worker_alive():
+            return super().send_mail(
+                subject_template_name, email_template_name, context,
+                from_email, to_email, html_email_template_name)
+        subject = ''.join(
+            render_to_string(subject_template_name, context).splitlines())
+        body = render_to_string(email_template_name, context)
+        html = None
+        if html_email_template_name is not None:
+            html = render_to_string(html_email_template_name, context)
+        enqueue(send_mail, subject, body, from_email, [to_email], html)
@@ -53,6 +53,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -72,7 +74,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.backends.MeteredDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -100,6 +102,17 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения — снимки основной базы, которые обновляет команда
+# snapshot_replicas. Их число задаётся переменной DATABASE_REPLICA_COUNT.
+for number in range(1, int(os.environ.get('DATABASE_REPLICA_COUNT', 0)) + 1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db.replica{number}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -147,11 +160,120 @@ LOGIN_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+# Версии лент, закэшированные страницы и вёдра ограничителя записи
+# должны быть общими для всех процессов сервера, поэтому кэш лежит в
+# файлах, а не в памяти процесса. Если серверов несколько, его нужно
+# заменить на memcached.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.backends.MeteredFileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'django_cache'),
+        'OPTIONS': {'MAX_ENTRIES': 20000},
     }
 }
+TEST_RUNNER = 'core.testing.TestRunner'
 
 AMOUNT_OF_POSTS = 10
+COMMENTS_BATCH_SIZE = 20
 POST_TITLE_FROM_TEXT_CUT = 15
+TIMELINE_MAX_LENGTH = 1000
+TIMELINE_BATCH_SIZE = 500
+FEED_CACHE_TIMEOUT = 60 * 60
+PAGINATOR_COUNT_TIMEOUT = 60
+PAGINATOR_WINDOW = 5
+PAGE_CACHE_TIMEOUT = 60 * 60
+CONDITIONAL_MAX_FEEDS = 200
+API_MAX_LIMIT = 100
+API_MAX_IDS = 100
+# Вёдра токенов на запись, см. core.ratelimit: (ёмкость, секунд на
+# полное пополнение) отдельно по пользователю и по IP. Бюджет IP шире,
+# чтобы за одним NAT помещалось несколько пользователей.
+RATE_LIMITS = {
+    'post_create': {'user': (5, 60), 'ip': (20, 60)},
+    'add_comment': {'user': (10, 60), 'ip': (40, 60)},
+    'profile_follow': {'user': (30, 60), 'ip': (120, 60)},
+    'profile_unfollow': {'user': (30, 60), 'ip': (120, 60)},
+}
+# Сколько прокси перед сайтом дописывают адрес клиента в заголовок
+# RATE_LIMIT_IP_HEADER (для nginx с proxy_add_x_forwarded_for — 1).
+# 0 — сайт принимает соединения напрямую, берётся REMOTE_ADDR.
+RATE_LIMIT_IP_HEADER = 'HTTP_X_FORWARDED_FOR'
+RATE_LIMIT_TRUSTED_PROXIES = 0
+POST_THUMBNAIL_GEOMETRY = '960x339'
+POST_THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_RETRY_TIMEOUT = 60 * 60
+IMAGE_PROCESSES = 2
+THUMBNAIL_KVSTORE = 'core.kvstore.KVStore'
+# Не в MEDIA_ROOT: содержимое медиа-каталога раздаётся публично.
+THUMBNAIL_KVSTORE_PATH = os.path.join(BASE_DIR, 'thumbnail_kvstore.sqlite3')
+THUMBNAIL_KVSTORE_LRU_SIZE = 10000
+THUMBNAIL_KVSTORE_LRU_TIMEOUT = 60
+
+FILE_UPLOAD_HANDLERS = ['posts.uploads.LimitedUploadHandler']
+UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+POST_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+POST_IMAGE_MAX_PIXELS = 50_000_000
+POST_IMAGE_MAX_SIZE = 2048
+POST_IMAGE_QUALITY = 85
+
+SEARCH_MAX_TERMS = 8
+SEARCH_COMMENT_WEIGHT = 0.5
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_BLOCK_SIZE = 1024 * 1024
+
+METRICS_DIR = os.path.join(BASE_DIR, 'metrics')
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_FLUSH_INTERVAL = 10
+METRICS_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Применяются к каждому соединению SQLite, см. core.sqlite.
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64 * 1024,  # отрицательное значение — в КиБ
+    'mmap_size': 256 * 1024 * 1024,
+    'auto_vacuum': 'INCREMENTAL',
+}
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_REPLICA_APPS = {'posts'}
+REPLICA_PIN_COOKIE = 'primary_pin'
+REPLICA_PIN_SECONDS = 10
+REPLICA_CACHE_TIMEOUT = 30
+
+# Фоновая очередь задач, см. core.jobs и manage.py run_jobs.
+JOBS_WORKERS = 4
+JOBS_POLL_INTERVAL = 1
+# Воркер продлевает блокировку выполняемых задач каждые JOBS_HEARTBEAT
+# секунд; задача без продления дольше JOBS_LOCK_TIMEOUT — брошенная.
+JOBS_LOCK_TIMEOUT = 10 * 60
+JOBS_HEARTBEAT = 30
+JOBS_MAX_ATTEMPTS = 5
+JOBS_BACKOFF = 30
+JOBS_BACKOFF_MAX = 60 * 60
+JOBS_KEEP_DAYS = 7
+# Расписание cron в TIME_ZONE, имя задачи и её аргументы.
+JOBS_PERIODIC = {
+    'sqlite_maintenance': {
+        'cron': '30 3 * * *',
+        'task': 'core.call_command',
+        'args': ['sqlite_maintenance'],
+    },
+    'reconcile_counters': {
+        'cron': '0 4 * * 0',
+        'task': 'core.call_command',
+        'args': ['reconcile_counters'],
+    },
+    'purge_jobs': {'cron': '0 5 * * *', 'task': 'core.purge_jobs'},
+}
+if DATABASE_REPLICAS:
+    JOBS_PERIODIC['snapshot_replicas'] = {
+        'cron': '*/5 * * * *',
+        'task': 'core.call_command',
+        'args': ['snapshot_replicas'],
+    }
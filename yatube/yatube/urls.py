@@ -3,6 +3,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import metrics_view
+
 handler404 = 'core.views.page_not_found'
 handler403 = 'core.views.permission_denied'
 handler500 = 'core.views.server_error'
@@ -13,6 +15,7 @@ urlpatterns = [
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG: